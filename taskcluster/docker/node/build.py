@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
-import functools
+import errno
+import fcntl
 import glob
 import hashlib
 import json
@@ -8,10 +9,14 @@ import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
 from pathlib import Path
 from zipfile import ZipFile
 
+from dependency_cache import install_dependencies
+
 
 # Changes to this list need to be synced with AMO.
 # Please reach out to the Add-ons Operations Team (awagner) before making any changes!
@@ -30,6 +35,23 @@ ID_ALLOWLIST = (
     "test@tests.mozilla.org",
 )
 
+# The hashes recorded for each artifact in the build's manifest.json. sha512
+# is what beetmover checks.
+INGEST_HASHES = ("sha256", "sha512")
+INGEST_BUFFER_SIZE = 1024 * 1024
+# fcntl only has FICLONE from Python 3.12.
+FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+# Errors for which copy_file_range falls back to sendfile, e.g. across
+# filesystems on older kernels.
+COPY_FILE_RANGE_UNSUPPORTED = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+)
+# Number of artifacts verified and staged at once.
+VERIFY_JOBS = int(os.environ.get("XPI_VERIFY_JOBS", os.cpu_count() or 1))
+
 
 def test_is_subdir(parent_dir, target_dir):
     p1 = Path(os.path.realpath(parent_dir))
@@ -91,7 +113,7 @@ def get_buildid_version(version):
     return buildid_version
 
 
-def find_manifests():
+def walk_manifests():
     for dir_name, subdir_list, file_list in os.walk(os.getcwd()):
         for dir_ in subdir_list:
             if dir_ in (".git", "node_modules"):
@@ -101,6 +123,34 @@ def find_manifests():
             yield f"{dir_name}/manifest.json"
 
 
+def find_manifests():
+    """Find the manifest.json files under the current directory, which is the
+    XPI's `directory` in its repository.
+
+    Tracked files are listed from the git index, so large untracked trees
+    (like an objdir or node_modules) are never walked. Outside of a git
+    checkout, the directory is walked instead.
+    """
+    try:
+        output = subprocess.check_output(
+            ["git", "ls-files", "-z", "--recurse-submodules", "--", "*manifest.json"],
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        print("Not in a git checkout; walking the directory for manifest.json files")
+        return list(walk_manifests())
+    manifests = []
+    for path in output.decode("utf-8").split("\0"):
+        parts = path.split("/")
+        if parts[-1] != "manifest.json" or "node_modules" in parts:
+            continue
+        path = os.path.join(os.getcwd(), path)
+        # Listed in the index, but deleted from the checkout.
+        if os.path.isfile(path):
+            manifests.append(path)
+    return manifests
+
+
 def get_and_update_version() -> str:
     """Find the original version number, change it to include a buildid,
     then update all references to the version.
@@ -132,7 +182,8 @@ def get_and_update_version() -> str:
         with open(manifest) as fh:
             contents = json.load(fh)
 
-        if "version" not in contents:
+        # Only rewrite WebExtension manifests.
+        if "version" not in contents or "manifest_version" not in contents:
             continue
 
         if not orig_version:
@@ -160,12 +211,102 @@ def get_and_update_version() -> str:
     return new_version
 
 
-def get_hash(path, hash_alg="sha256"):
-    h = hashlib.new(hash_alg)
-    with open(path, "rb") as fh:
-        for chunk in iter(functools.partial(fh.read, 4096), b""):
+def _reflink(path, target_path):
+    with open(path, "rb") as src, open(target_path, "wb") as dest:
+        fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+
+
+def _copy_in_kernel(path, target_path):
+    with open(path, "rb") as src, open(target_path, "wb") as dest:
+        size = os.fstat(src.fileno()).st_size
+        copied = 0
+        use_copy_file_range = hasattr(os, "copy_file_range")
+        while copied < size:
+            if use_copy_file_range:
+                try:
+                    n = os.copy_file_range(src.fileno(), dest.fileno(), size - copied)
+                except OSError as e:
+                    if e.errno not in COPY_FILE_RANGE_UNSUPPORTED:
+                        raise
+                    # Both files are at offset `copied`, where sendfile
+                    # carries on.
+                    use_copy_file_range = False
+                    continue
+            else:
+                n = os.sendfile(dest.fileno(), src.fileno(), copied, size - copied)
+            if n == 0:
+                raise OSError(f"{path} was truncated while copying it")
+            copied += n
+
+
+def stage_file(path, target_path):
+    """Make `target_path` a copy of `path` without reading it into memory,
+    sharing its data on disk when the filesystem allows it.
+
+    Tries a reflink, then copying within the kernel. Hardlinks aren't used,
+    as the copy would then share its permissions and later writes with
+    `path`.
+
+    Returns:
+        str: the method used, or None if the file has to be copied by hand.
+    """
+    if os.path.lexists(target_path):
+        os.remove(target_path)
+    for method, stage in (
+        ("reflink", _reflink),
+        ("kernel copy", _copy_in_kernel),
+    ):
+        try:
+            stage(path, target_path)
+        except OSError:
+            if os.path.lexists(target_path):
+                os.remove(target_path)
+            continue
+        return method
+    return None
+
+
+def _read_artifact(src, dest=None):
+    """Read `src` once, writing it to `dest` if given.
+
+    Returns:
+        dict: the size, sha256 and sha512 of the bytes read.
+    """
+    hashes = {hash_alg: hashlib.new(hash_alg) for hash_alg in INGEST_HASHES}
+    size = 0
+    buf = bytearray(INGEST_BUFFER_SIZE)
+    view = memoryview(buf)
+    while n := src.readinto(buf):
+        chunk = view[:n]
+        for h in hashes.values():
             h.update(chunk)
-    return h.hexdigest()
+        if dest:
+            dest.write(chunk)
+        size += n
+    return {
+        "filesize_bytes": size,
+        **{hash_alg: h.hexdigest() for hash_alg, h in hashes.items()},
+    }
+
+
+def ingest_artifact(path, target_path):
+    """Stage `path` at `target_path`, reading it only once, and make the
+    copy read-only so it isn't changed by accident before it's uploaded.
+
+    Returns:
+        dict: the size, sha256 and sha512 of the staged artifact.
+    """
+    method = stage_file(path, target_path)
+    if method:
+        print(f"Staged {path} at {target_path} with a {method}")
+        os.chmod(target_path, 0o444)
+        with open(target_path, "rb") as src:
+            return _read_artifact(src)
+    print(f"Copying {path} to {target_path}")
+    with open(path, "rb") as src, open(target_path, "wb") as dest:
+        artifact_info = _read_artifact(src, dest)
+    os.chmod(target_path, 0o444)
+    return artifact_info
 
 
 def is_version_mv3_compliant(version):
@@ -233,6 +374,33 @@ def check_manifest(path, buildid_version):
         raise Exception("Can't find addon ID in manifest.json!")
 
 
+def stage_artifact(artifact, target_path, artifact_prefix, buildid_version):
+    """Verify `artifact` and stage it at `target_path`.
+
+    Returns:
+        dict: the artifact's entry in the build's manifest.json.
+    """
+    if not os.path.exists(artifact):
+        raise Exception(f"Missing artifact {artifact}")
+    test_is_subdir(os.getcwd(), artifact)
+    artifact_info = {
+        "path": os.path.join(artifact_prefix, os.path.basename(artifact)),
+        **ingest_artifact(artifact, target_path),
+    }
+    check_manifest(target_path, buildid_version)
+    return artifact_info
+
+
+def _stage_artifact_or_error(artifact, target_path, artifact_prefix, buildid_version):
+    try:
+        return (
+            stage_artifact(artifact, target_path, artifact_prefix, buildid_version),
+            None,
+        )
+    except Exception as e:
+        return None, f"{artifact}: {e}"
+
+
 def main():
     test_var_set(
         [
@@ -291,12 +459,13 @@ def main():
         stage_xpi = glob.glob(f"{objdir}/dist/xpi-stage/{xpi_name}@*.xpi")
         if len(stage_xpi) != 1:
             raise Exception(f"Expected exactly one {xpi_name}@*.xpi, but found {stage_xpi}")
-        shutil.copyfile(stage_xpi[0], dest)
+        if not stage_file(stage_xpi[0], dest):
+            shutil.copyfile(stage_xpi[0], dest)
     elif install_type == "yarn":
-        run_command(["yarn", "install", "--frozen-lockfile"])
+        install_dependencies("yarn", run_command)
         run_command(["yarn", "build"])
     else:
-        run_command(["npm", "clean-install"])
+        install_dependencies("npm", run_command)
         run_command(["npm", "run", "build"])
 
     if "XPI_ARTIFACTS" in os.environ:
@@ -304,24 +473,34 @@ def main():
     else:
         xpi_artifacts = glob.glob("*.xpi") + glob.glob("**/*.xpi")
 
-    all_paths = []
+    targets = {}
+    errors = []
     for artifact in xpi_artifacts:
         target_path = os.path.join(artifact_dir, os.path.basename(artifact))
-        if target_path in all_paths:
-            raise Exception(f"{target_path} already exists!")
-        all_paths.append(target_path)
-        if not os.path.exists(artifact):
-            raise Exception(f"Missing artifact {artifact}")
-        test_is_subdir(os.getcwd(), artifact)
-        print(f"Copying {artifact} to {target_path}")
-        artifact_info = {
-            "path": os.path.join(artifact_prefix, os.path.basename(artifact)),
-            "filesize_bytes": int(os.path.getsize(artifact)),
-            "sha256": str(get_hash(artifact)),
-        }
-        build_manifest["artifacts"].append(artifact_info)
-        shutil.copyfile(artifact, target_path)
-        check_manifest(target_path, buildid_version)
+        if target_path in targets.values():
+            errors.append(f"{artifact}: {target_path} already exists!")
+            continue
+        targets[artifact] = target_path
+
+    # Artifacts are verified in parallel, but listed in manifest.json in
+    # their original order.
+    jobs = max(1, min(VERIFY_JOBS, len(targets)))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(
+            executor.map(
+                _stage_artifact_or_error,
+                targets.keys(),
+                targets.values(),
+                repeat(artifact_prefix),
+                repeat(buildid_version),
+            )
+        )
+    errors.extend(error for _, error in results if error)
+    if errors:
+        raise Exception(
+            "{} invalid artifact(s):\n\n{}".format(len(errors), "\n\n".join(errors))
+        )
+    build_manifest["artifacts"] = [artifact_info for artifact_info, _ in results]
 
     with open(os.path.join(artifact_dir, "manifest.json"), "w") as fh:
         fh.write(json.dumps(build_manifest, indent=2, sort_keys=True))
@@ -0,0 +1,165 @@
+"""Snapshots of installed node_modules, shared by the tasks run on a worker.
+
+Snapshots are keyed on everything that determines what gets installed: the
+lockfile, the dependencies in package.json, the Node version and the
+install-type and its version. Set XPI_DEPENDENCY_CACHE to the directory they're kept in to
+restore dependencies from there instead of installing them.
+
+Installs also prefer the packages in XPI_PACKAGE_CACHE, when it's set, to
+downloading them from the registry (see fetch_deps.py).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+LOCKFILES = {
+    "npm": "package-lock.json",
+    "yarn": "yarn.lock",
+}
+INSTALL_COMMANDS = {
+    "npm": ["npm", "clean-install"],
+    "yarn": ["yarn", "install", "--frozen-lockfile"],
+}
+# The parts of package.json installing dependencies depends on, besides the
+# lockfile.
+PACKAGE_KEYS = (
+    "dependencies",
+    "devDependencies",
+    "optionalDependencies",
+    "peerDependencies",
+    "overrides",
+    "resolutions",
+)
+# Scripts run by installing, which may change files outside of node_modules.
+INSTALL_SCRIPTS = (
+    "preinstall",
+    "install",
+    "postinstall",
+    "prepublish",
+    "preprepare",
+    "prepare",
+    "postprepare",
+)
+# Least recently used snapshots are removed past this size, in bytes.
+MAX_SIZE = int(os.environ.get("XPI_DEPENDENCY_CACHE_SIZE", 10 * 1024**3))
+
+
+def package_cache_options(install_type, path):
+    """Return the options making ``install_type`` use the package cache in
+    ``path``."""
+    if install_type == "yarn":
+        return ["--cache-folder", path]
+    return ["--cache", path]
+
+
+def get_install_command(install_type):
+    command = list(INSTALL_COMMANDS[install_type])
+    package_cache = os.environ.get("XPI_PACKAGE_CACHE")
+    if package_cache and os.path.isdir(package_cache):
+        command.append("--prefer-offline")
+        command.extend(package_cache_options(install_type, package_cache))
+    return command
+
+
+def get_cache_key(install_type):
+    """Return the key of the snapshot for the current directory, or None if
+    its dependencies can't be cached."""
+    lockfile = LOCKFILES.get(install_type)
+    if not lockfile or not os.path.isfile(lockfile):
+        return None
+    if not os.path.isfile("package.json"):
+        print("No package.json; not caching dependencies")
+        return None
+    with open("package.json") as fh:
+        package_info = json.load(fh)
+    if set(package_info.get("scripts", {})) & set(INSTALL_SCRIPTS):
+        print("package.json has install scripts; not caching dependencies")
+        return None
+    # Only the top-level node_modules is snapshotted, while workspaces also
+    # install into their own.
+    if package_info.get("workspaces"):
+        print("package.json has workspaces; not caching dependencies")
+        return None
+    h = hashlib.sha256()
+    h.update(install_type.encode())
+    h.update(subprocess.check_output(["node", "--version"]))
+    h.update(subprocess.check_output([install_type, "--version"]))
+    h.update(
+        json.dumps(
+            {key: package_info.get(key) for key in PACKAGE_KEYS}, sort_keys=True
+        ).encode()
+    )
+    with open(lockfile, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def restore(snapshot):
+    if not os.path.isfile(snapshot):
+        return False
+    print(f"Restoring node_modules from {snapshot} ...")
+    shutil.rmtree("node_modules", ignore_errors=True)
+    try:
+        subprocess.check_call(["tar", "--zstd", "-xf", snapshot])
+    except subprocess.CalledProcessError:
+        print(f"Could not extract {snapshot}; installing dependencies instead")
+        shutil.rmtree("node_modules", ignore_errors=True)
+        return False
+    # Mark the snapshot as recently used.
+    os.utime(snapshot)
+    return True
+
+
+def evict(cache_dir):
+    snapshots = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".tar.zst"):
+                stat = entry.stat()
+                snapshots.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in snapshots)
+    for _, size, path in sorted(snapshots):
+        if total <= MAX_SIZE:
+            break
+        print(f"Removing {path} from the dependency cache")
+        os.remove(path)
+        total -= size
+
+
+def save(cache_dir, snapshot):
+    if not os.path.isdir("node_modules"):
+        return
+    print(f"Saving node_modules to {snapshot} ...")
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        subprocess.check_call(["tar", "--zstd", "-cf", tmp_path, "node_modules"])
+        os.replace(tmp_path, snapshot)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict(cache_dir)
+
+
+def install_dependencies(install_type, run_command):
+    """Install the dependencies in the current directory with `install_type`,
+    restoring them from the dependency cache if it's enabled and has them."""
+    cache_dir = os.environ.get("XPI_DEPENDENCY_CACHE")
+    key = get_cache_key(install_type) if cache_dir else None
+    if not key:
+        run_command(get_install_command(install_type))
+        return
+    snapshot = os.path.join(cache_dir, f"{key}.tar.zst")
+    if restore(snapshot):
+        return
+    run_command(get_install_command(install_type))
+    try:
+        save(cache_dir, snapshot)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not save node_modules to the dependency cache: {e}")
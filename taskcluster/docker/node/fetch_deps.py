@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""Download the dependencies of the XPI in the current directory into a
+package cache, published as an artifact for build and test tasks to install
+from without going back to the registry.
+
+The registry can be replaced with a local mirror through the usual npm and
+yarn configuration, e.g. `npm_config_registry`.
+"""
+
+import os
+import subprocess
+import sys
+
+from dependency_cache import INSTALL_COMMANDS, package_cache_options
+
+PACKAGE_CACHE = "package-cache"
+
+
+def run_command(command, **kwargs):
+    print(f"Running {command} ...")
+    subprocess.check_call(command, **kwargs)
+
+
+def main():
+    install_type = os.environ.get("XPI_INSTALL_TYPE") or "npm"
+    if install_type not in INSTALL_COMMANDS:
+        raise Exception(f"Can't fetch dependencies for {install_type} XPIs")
+
+    artifact_dir = "/builds/worker/artifacts"
+    work_dir = "/builds/worker/package-cache-work"
+    cache_dir = os.path.join(work_dir, PACKAGE_CACHE)
+
+    # Installing is the only way to fill the cache with exactly what the
+    # lockfile needs. Scripts aren't run, as only the packages are kept.
+    run_command(
+        INSTALL_COMMANDS[install_type]
+        + ["--ignore-scripts"]
+        + package_cache_options(install_type, cache_dir)
+    )
+
+    os.makedirs(artifact_dir, exist_ok=True)
+    run_command(
+        [
+            "tar",
+            "--zstd",
+            "-cf",
+            os.path.join(artifact_dir, f"{PACKAGE_CACHE}.tar.zst"),
+            "-C",
+            work_dir,
+            PACKAGE_CACHE,
+        ]
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
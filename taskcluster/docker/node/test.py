@@ -8,6 +8,8 @@ from pathlib import Path
 import subprocess
 import sys
 
+from dependency_cache import install_dependencies
+
 
 def test_is_subdir(parent_dir, target_dir):
     p1 = Path(os.path.realpath(parent_dir))
@@ -62,10 +64,8 @@ def main():
     install_type = os.environ.get("XPI_INSTALL_TYPE", "yarn")
 
     match install_type:
-        case "yarn":
-            run_command(["yarn", "install", "--frozen-lockfile"])
-        case "npm":
-            run_command(["npm", "clean-install"])
+        case "yarn" | "npm":
+            install_dependencies(install_type, run_command)
 
     commands = []
     if len(sys.argv) != 1:
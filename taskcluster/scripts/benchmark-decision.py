@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Benchmark decision tasks by generating the full, target and optimized graphs
+for each parameters file in taskcluster/test/params.
+
+Every run happens in a fresh process, so in-memory caches start cold and
+peak RSS covers a single generation (including the processes kinds are
+loaded in). The on-disk manifest cache is used as usual; set
+XPI_MANIFEST_CACHE_DIR= to disable it. Index and queue lookups are stubbed
+out, so nothing is optimized away and no network access is needed.
+
+Exits with status 1 if generating the graphs fails, or if the median time
+or peak RSS of any parameters file exceeds the given budget.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PARAMS_DIR = os.path.join(ROOT, "taskcluster", "test", "params")
+PHASES = ("full_task_graph", "target_task_graph", "optimized_task_graph")
+
+
+def stub_network():
+    """Behave as if nothing has been indexed yet."""
+    import taskgraph.optimize.base
+    import taskgraph.optimize.strategies
+
+    def find_task_id(index_path):
+        raise KeyError(index_path)
+
+    taskgraph.optimize.base.find_task_id_batched = lambda index_paths: {}
+    taskgraph.optimize.base.status_task_batched = lambda task_ids: {}
+    taskgraph.optimize.strategies.find_task_id = find_task_id
+    # Only used to format artifact URLs.
+    os.environ.setdefault("TASKCLUSTER_ROOT_URL", "https://tc.example.invalid")
+
+
+def run_once(params_path):
+    """Generate the graphs for ``params_path`` and return the time taken by
+    each phase and the peak RSS."""
+    stub_network()
+    from taskgraph.generator import TaskGraphGenerator
+    from taskgraph.parameters import parameters_loader
+
+    timings = {}
+    start = last = time.perf_counter()
+    tgg = TaskGraphGenerator(
+        root_dir=os.path.join(ROOT, "taskcluster"),
+        parameters=parameters_loader(params_path, strict=False),
+    )
+    for phase in PHASES:
+        getattr(tgg, phase)
+        now = time.perf_counter()
+        timings[phase] = now - last
+        last = now
+    timings["total"] = last - start
+    # ru_maxrss is in KiB on Linux.
+    peak_rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return {"seconds": timings, "peak-rss-mib": peak_rss / 1024}
+
+
+def run_in_subprocess(params_path):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--run-once", params_path],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        sys.stderr.write(proc.stderr)
+        return None
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def summarize(runs):
+    summary = {}
+    for key in PHASES + ("total",):
+        values = [run["seconds"][key] for run in runs]
+        summary[key] = {
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "max": max(values),
+        }
+    summary["peak-rss-mib"] = max(run["peak-rss-mib"] for run in runs)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "params",
+        nargs="*",
+        help="parameters files to benchmark (default: all in taskcluster/test/params)",
+    )
+    parser.add_argument(
+        "-n", "--iterations", type=int, default=5, help="measured runs per file"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="unmeasured runs per file"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="fail if the median total time of any file exceeds this",
+    )
+    parser.add_argument(
+        "--max-rss", type=float, help="fail if the peak RSS (MiB) exceeds this"
+    )
+    parser.add_argument("-o", "--output", help="also write the results to this file")
+    parser.add_argument("--run-once", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:
+        print(json.dumps(run_once(args.run_once)))
+        return 0
+
+    params_paths = args.params or sorted(glob.glob(os.path.join(PARAMS_DIR, "*.yml")))
+    results = {}
+    failures = []
+    print(f"{'params':<40} {'p50':>8} {'p90':>8} {'max':>8} {'rss MiB':>8}")
+    for params_path in params_paths:
+        name = os.path.splitext(os.path.basename(params_path))[0]
+        for _ in range(args.warmup):
+            run_in_subprocess(params_path)
+        runs = [run_in_subprocess(params_path) for _ in range(args.iterations)]
+        if None in runs:
+            failures.append(f"{name}: generating graphs failed")
+            continue
+        results[name] = summary = summarize(runs)
+        total = summary["total"]
+        print(
+            f"{name:<40} {total['p50']:>8.2f} {total['p90']:>8.2f} "
+            f"{total['max']:>8.2f} {summary['peak-rss-mib']:>8.1f}"
+        )
+        if args.max_seconds is not None and total["p50"] > args.max_seconds:
+            failures.append(
+                f"{name}: median {total['p50']:.2f}s exceeds budget of {args.max_seconds}s"
+            )
+        if args.max_rss is not None and summary["peak-rss-mib"] > args.max_rss:
+            failures.append(
+                f"{name}: peak RSS {summary['peak-rss-mib']:.1f} MiB exceeds "
+                f"{args.max_rss} MiB"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Measure how decision time and memory grow with the number of XPIs.
+
+For each size N, the repository is copied to a temporary directory, its
+manifests are replaced with N synthetic ones covering every addon-type and
+install-type, and config.yml gets a repository for each of them. Graphs are
+then generated with benchmark-decision.py.
+
+The growth exponent between consecutive sizes is reported next to each
+result: 1.0 is linear, and anything well above it is a superlinear hot spot.
+Pass --profile to also break the time down by transform.
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import typing
+from collections import defaultdict
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PARAMS_DIR = os.path.join(ROOT, "taskcluster", "test", "params")
+
+sys.path.insert(0, os.path.join(ROOT, "taskcluster"))
+from xpi_taskgraph.xpi_manifest import XpiManifest  # noqa: E402
+
+
+def _literal_values(annotation):
+    values = []
+    for arg in typing.get_args(annotation):
+        if typing.get_origin(arg) is typing.Literal:
+            values.extend(typing.get_args(arg))
+        elif arg is not type(None):
+            values.append(arg)
+    return values
+
+
+ADDON_TYPES = _literal_values(XpiManifest.__annotations__["addon_type"])
+INSTALL_TYPES = _literal_values(XpiManifest.__annotations__["install_type"]) + [None]
+
+
+def synthetic_manifest(i):
+    name = f"synthetic-{i:05}"
+    private = i % 5 == 0
+    manifest = {
+        "description": f"Synthetic XPI {i}",
+        "repo-prefix": f"synthetic{i:05}",
+        "active": i % 10 != 9,
+        "private-repo": private,
+        "branch": "main",
+        "artifacts": [f"web-ext-artifacts/{name}.xpi"],
+        "addon-type": ADDON_TYPES[i % len(ADDON_TYPES)],
+        "enable-github-release": i % 3 == 0,
+        "enable-test": i % 4 != 0,
+    }
+    install_type = INSTALL_TYPES[(i // len(ADDON_TYPES)) % len(INSTALL_TYPES)]
+    if install_type:
+        manifest["install-type"] = install_type
+    if private:
+        url = f"git@github.com:mozilla-extensions/{name}"
+    else:
+        url = f"https://github.com/mozilla-extensions/{name}"
+    repository = {
+        "name": f"Synthetic XPI {i}",
+        "project-regex": f"{name}$",
+        "default-repository": url,
+        "default-ref": "main",
+        "type": "git",
+    }
+    return name, manifest, repository
+
+
+def make_tree(path, size):
+    shutil.copytree(
+        os.path.join(ROOT, "taskcluster"),
+        os.path.join(path, "taskcluster"),
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    shutil.copy(os.path.join(ROOT, ".taskcluster.yml"), path)
+    manifest_dir = os.path.join(path, "manifests")
+    os.mkdir(manifest_dir)
+
+    config_path = os.path.join(path, "taskcluster", "config.yml")
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    names = {}
+    for i in range(size):
+        name, manifest, repository = synthetic_manifest(i)
+        names.setdefault(manifest["addon-type"], name)
+        config["taskgraph"]["repositories"][manifest["repo-prefix"]] = repository
+        with open(os.path.join(manifest_dir, f"{name}.yml"), "w") as f:
+            yaml.safe_dump(manifest, f)
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+
+    # Decision tasks run in a git checkout, which resource digests rely on.
+    git = ["git", "-C", path, "-c", "user.name=bench", "-c", "user.email=bench@"]
+    subprocess.run(git + ["init", "-q"], check=True)
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "Synthetic tree"], check=True)
+    return names
+
+
+def write_params(path, params_path, names):
+    """Copy ``params_path`` into the tree, pointing actions at a synthetic
+    XPI of the same addon-type as the original."""
+    with open(params_path) as f:
+        params = yaml.safe_load(f)
+    if params.get("xpi_name"):
+        with open(os.path.join(ROOT, "manifests", f"{params['xpi_name']}.yml")) as f:
+            params["xpi_name"] = names[yaml.safe_load(f)["addon-type"]]
+    out = os.path.join(path, os.path.basename(params_path))
+    with open(out, "w") as f:
+        yaml.safe_dump(params, f)
+    return out
+
+
+def benchmark(path, params_path, args):
+    env = dict(os.environ, XPI_MANIFEST_CACHE_DIR=os.path.join(path, "cache"))
+    if args.profile:
+        env["XPI_PROFILE_TRANSFORMS"] = "1"
+    output = os.path.join(path, "benchmark.json")
+    proc = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(path, "taskcluster", "scripts", "benchmark-decision.py"),
+            "--iterations",
+            str(args.iterations),
+            "--warmup",
+            str(args.warmup),
+            "--output",
+            output,
+            params_path,
+        ],
+        cwd=path,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    if proc.returncode:
+        return None
+    with open(output) as f:
+        (result,) = json.load(f).values()
+    if args.profile:
+        transforms = defaultdict(float)
+        with open(os.path.join(path, "artifacts", "transform-profile.json")) as f:
+            for stats in json.load(f).values():
+                for transform in stats:
+                    transforms[transform["name"]] += transform["seconds"]
+        result["transforms"] = dict(transforms)
+    return result
+
+
+def exponent(size, value, prev_size, prev_value):
+    if not prev_size or not prev_value or not value:
+        return None
+    return math.log(value / prev_value) / math.log(size / prev_size)
+
+
+def _format_exponent(value):
+    return "" if value is None else f"{value:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "params",
+        nargs="*",
+        help="parameters files to benchmark (default: xpi-onpush.yml and "
+        "privileged-build.yml from taskcluster/test/params)",
+    )
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 5000, 10000],
+        help="numbers of manifests to generate",
+    )
+    parser.add_argument(
+        "-n", "--iterations", type=int, default=1, help="measured runs per size"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="unmeasured runs per size"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="report the slowest transforms"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="number of transforms to report"
+    )
+    parser.add_argument("-o", "--output", help="also write the results to this file")
+    args = parser.parse_args()
+
+    params_paths = args.params or [
+        os.path.join(PARAMS_DIR, "xpi-onpush.yml"),
+        os.path.join(PARAMS_DIR, "privileged-build.yml"),
+    ]
+    results = defaultdict(dict)
+    failed = False
+    for size in sorted(args.sizes):
+        with tempfile.TemporaryDirectory(prefix=f"xpi-scale-{size}-") as path:
+            names = make_tree(path, size)
+            for params_path in params_paths:
+                name = os.path.splitext(os.path.basename(params_path))[0]
+                result = benchmark(path, write_params(path, params_path, names), args)
+                if result is None:
+                    print(f"FAILED {name} with {size} manifests", file=sys.stderr)
+                    failed = True
+                    continue
+                results[name][size] = result
+
+    for name, by_size in results.items():
+        print(f"\n{name}")
+        print(f"{'manifests':>10} {'p50 s':>8} {'ms/xpi':>8} {'exp':>6} {'rss MiB':>8}")
+        prev_size = prev_total = None
+        for size, result in sorted(by_size.items()):
+            total = result["total"]["p50"]
+            result["exponent"] = exponent(size, total, prev_size, prev_total)
+            print(
+                f"{size:>10} {total:>8.2f} {total / size * 1000:>8.3f} "
+                f"{_format_exponent(result['exponent']):>6} "
+                f"{result['peak-rss-mib']:>8.1f}"
+            )
+            prev_size, prev_total = size, total
+
+        sizes = sorted(by_size)
+        if args.profile and len(sizes) > 1:
+            first, last = by_size[sizes[0]], by_size[sizes[-1]]
+            slowest = sorted(
+                last["transforms"], key=last["transforms"].get, reverse=True
+            )
+            print(f"\n{'transform':<60} {'s':>8} {'exp':>6}")
+            for transform in slowest[: args.top]:
+                seconds = last["transforms"][transform]
+                growth = exponent(
+                    sizes[-1],
+                    seconds,
+                    sizes[0],
+                    first["transforms"].get(transform),
+                )
+                print(f"{transform:<60} {seconds:>8.2f} {_format_exponent(growth):>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Check that `xpi_taskgraph.json_stream` reads task graphs the same way
+`json.loads` does, whatever the size of the chunks they're downloaded in.
+
+Each of the given `full-task-graph.json` files, or else the full task graph
+generated for taskcluster/test/params/xpi-onpush.yml, is split into chunks
+of a range of sizes and streamed back. A small document with numbers cut
+at every position is checked too.
+
+Exits with status 1 if any of them doesn't round-trip.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PARAMS = os.path.join(ROOT, "taskcluster", "test", "params", "xpi-onpush.yml")
+CHUNK_SIZES = list(range(1, 17)) + [2**n + d for n in range(5, 17) for d in (-1, 0, 1)]
+# Numbers, strings with escapes and non-ASCII characters, and literals, which
+# all end up cut at every position by the smaller chunk sizes.
+SAMPLE = {
+    "float": 1.5,
+    "exponent": -2.5e-3,
+    "integers": [0, -1, 1234567890],
+    "string": 'café ☃ "quoted" \\',
+    "literals": [True, False, None],
+    "nested": {"a": [{"b": 10.25}], "c": {}},
+}
+
+
+def generate_graph():
+    sys.path.insert(0, os.path.join(ROOT, "taskcluster"))
+    from taskgraph.generator import TaskGraphGenerator
+    from taskgraph.parameters import parameters_loader
+
+    tgg = TaskGraphGenerator(
+        root_dir=os.path.join(ROOT, "taskcluster"),
+        parameters=parameters_loader(PARAMS, strict=False),
+    )
+    return json.dumps(tgg.full_task_graph.to_json()).encode("utf-8")
+
+
+def check(name, data):
+    from xpi_taskgraph.json_stream import iter_object_items
+
+    expected = list(json.loads(data).items())
+    failed = []
+    for size in CHUNK_SIZES:
+        chunks = (data[i : i + size] for i in range(0, len(data), size))
+        try:
+            items = list(iter_object_items(chunks))
+        except ValueError as e:
+            failed.append(f"{size}: {e}")
+            continue
+        if items != expected:
+            failed.append(f"{size}: items differ")
+    if failed:
+        print(f"{name} doesn't round-trip with chunk size(s):")
+        for failure in failed:
+            print(f"  {failure}")
+    else:
+        print(f"{name}: ok ({len(expected)} items, {len(data)} bytes)")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "graphs",
+        nargs="*",
+        help="full-task-graph.json files to check (default: generate one)",
+    )
+    args = parser.parse_args()
+
+    documents = {"sample": json.dumps(SAMPLE).encode("utf-8")}
+    if args.graphs:
+        for path in args.graphs:
+            with open(path, "rb") as f:
+                documents[path] = f.read()
+    else:
+        documents[os.path.relpath(PARAMS, ROOT)] = generate_graph()
+
+    results = [check(name, data) for name, data in documents.items()]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
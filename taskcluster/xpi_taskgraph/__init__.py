@@ -7,6 +7,8 @@ from importlib import import_module
 
 import mozilla_taskgraph
 
+from . import profiling
+
 
 def register(graph_config):
     """
@@ -14,8 +16,12 @@ def register(graph_config):
     the process.
     """
     mozilla_taskgraph.register(graph_config)
+    profiling.enable()
     _import_modules(
         [
+            "cache_stats",
+            "digests",
+            "optimizations",
             "parameters",
             "release_promotion",
             "routes",
@@ -0,0 +1,138 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+An on-disk cache for things that never change once they exist, like the
+artifacts of a given taskId, shared by the action tasks run on a worker.
+
+Values are stored once per content, under their sha256, and looked up through
+small references named after the sha256 of their key. The least recently used
+entries are evicted when the cache grows past its maximum size.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Decision and action tasks mount a per-level cache for this (see
+# .taskcluster.yml). Set XPI_ARTIFACT_CACHE_DIR to an empty string to disable
+# the cache.
+CACHE_DIR = os.environ.get(
+    "XPI_ARTIFACT_CACHE_DIR", os.path.expanduser("~/.cache/xpi-artifacts")
+)
+MAX_SIZE = int(os.environ.get("XPI_ARTIFACT_CACHE_SIZE", 512 * 1024 * 1024))
+
+
+class DirectoryBackend:
+    """Store cache entries as files in ``path``.
+
+    Any object with the same methods can be used as a backend instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def get(self, name):
+        """Return the content of ``name``, or None, marking it as used."""
+        path = os.path.join(self.path, name)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, name, data):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def delete(self, name):
+        try:
+            os.remove(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """Yield the name, size and last use time of each entry."""
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    yield entry.name, stat.st_size, stat.st_mtime
+        except FileNotFoundError:
+            return
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ArtifactCache:
+    """Cache JSON-serializable values in ``backend``, or nothing if it's
+    None. Errors from the backend are logged rather than raised, falling
+    back to fetching the value."""
+
+    def __init__(self, backend, max_size=MAX_SIZE):
+        self.backend = backend
+        self.max_size = max_size
+
+    def _get(self, key):
+        ref = self.backend.get(f"ref-{_sha256(key.encode())}")
+        if ref is None:
+            return None
+        data = self.backend.get(f"blob-{ref.decode()}")
+        if data is None or _sha256(data) != ref.decode():
+            # Evicted or corrupted since the reference was written.
+            return None
+        return json.loads(data)
+
+    def _put(self, key, value):
+        data = json.dumps(value, sort_keys=True).encode()
+        digest = _sha256(data)
+        self.backend.put(f"blob-{digest}", data)
+        self.backend.put(f"ref-{_sha256(key.encode())}", digest.encode())
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in
+        ``max_size``."""
+        entries = sorted(self.backend.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for name, size, _ in entries:
+            if total <= self.max_size:
+                break
+            self.backend.delete(name)
+            total -= size
+
+    def fetch(self, key, fetch):
+        """Return the value cached for ``key``, calling ``fetch`` to get it
+        if it isn't cached yet. Exceptions from ``fetch`` are not cached, and
+        values that can't be serialized are returned without being cached."""
+        if self.backend is not None:
+            try:
+                value = self._get(key)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read {key} from the artifact cache: {e}")
+                value = None
+            if value is not None:
+                return value
+        value = fetch()
+        if self.backend is not None:
+            try:
+                self._put(key, value)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not write {key} to the artifact cache: {e}")
+        return value
+
+
+artifact_cache = ArtifactCache(DirectoryBackend(CACHE_DIR) if CACHE_DIR else None)
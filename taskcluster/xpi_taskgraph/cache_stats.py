@@ -0,0 +1,132 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Write `public/cache-stats.json`, describing which cached tasks were optimized
+away and, for the ones that weren't, which inputs changed since the task that
+was last indexed for them.
+
+Comparing inputs means looking up the last indexed tasks, so this is only
+done when XPI_CACHE_STATS is set, which .taskcluster.yml does for pushes.
+"""
+
+import logging
+import os
+
+from taskgraph.decision import write_artifact
+from taskgraph.util.taskcluster import find_task_id_batched, get_task_definitions
+from taskgraph.util.verify import verifications
+
+logger = logging.getLogger(__name__)
+
+CACHE_STATS = bool(os.environ.get("XPI_CACHE_STATS"))
+
+LATEST_INDEX = "{cache_prefix}.cache.level-{level}.{type}.{name}.latest"
+
+# The target task graph, kept until the optimized graph is known.
+_target_task_graph = None
+
+
+def _get_latest_inputs(index_paths):
+    """Return the task id and `cache-inputs` of the last task indexed under
+    each of ``index_paths``."""
+    try:
+        task_ids = find_task_id_batched(index_paths)
+        definitions = get_task_definitions(list(task_ids.values()))
+    except Exception:
+        logger.warning("Couldn't look up the last indexed tasks", exc_info=True)
+        return {}
+    return {
+        path: (task_id, definitions.get(task_id, {}).get("extra", {}))
+        for path, task_id in task_ids.items()
+    }
+
+
+def get_cache_stats(target_task_graph, optimized_task_graph, graph_config, params):
+    """Return the digest, inputs and outcome of each cached task in the
+    target graph, by kind and XPI.
+
+    ``changed`` lists the inputs that differ from the last indexed task's,
+    or is null when there's nothing indexed to compare with.
+    """
+    cache_prefix = graph_config["taskgraph"].get(
+        "cached-task-prefix", graph_config["trust-domain"]
+    )
+    scheduled = {task.label for task in optimized_task_graph.tasks.values()}
+    stats = {}
+    latest_paths = {}
+    for task in target_task_graph.tasks.values():
+        cached_task = task.attributes.get("cached_task")
+        if not cached_task:
+            continue
+        kind_stats = stats.setdefault(
+            task.kind, {"optimized": 0, "scheduled": 0, "tasks": {}}
+        )
+        optimized = task.label not in scheduled
+        kind_stats["optimized" if optimized else "scheduled"] += 1
+        extra = task.task.get("extra", {})
+        inputs = extra.get("cache-inputs", {})
+        # Tasks that aren't built per XPI, like docker images, use their
+        # cache name.
+        name = extra.get("xpi-name", cached_task["name"])
+        kind_stats["tasks"][name] = entry = {
+            "label": task.label,
+            "digest": cached_task["digest"],
+            "inputs": inputs,
+            "optimized": optimized,
+            "changed": [] if optimized else None,
+        }
+        if not optimized:
+            # Compare with the highest level the task could have been reused
+            # from, as the optimization does.
+            latest_paths[task.label] = (
+                entry,
+                inputs,
+                [
+                    LATEST_INDEX.format(
+                        cache_prefix=cache_prefix, level=level, **cached_task
+                    )
+                    for level in reversed(range(int(params["level"]), 4))
+                ],
+            )
+
+    index_paths = sorted(p for _, _, paths in latest_paths.values() for p in paths)
+    latest = _get_latest_inputs(index_paths) if index_paths else {}
+    for entry, inputs, paths in latest_paths.values():
+        path = next((p for p in paths if p in latest), None)
+        if not path:
+            # Nothing has been indexed for this task yet.
+            continue
+        task_id, extra = latest[path]
+        entry["previous-task-id"] = task_id
+        if "cache-inputs" not in extra:
+            # Indexed before inputs were recorded.
+            continue
+        previous = extra["cache-inputs"]
+        entry["changed"] = sorted(
+            name
+            for name in set(inputs) | set(previous)
+            if inputs.get(name) != previous.get(name)
+        )
+    return stats
+
+
+@verifications.add("target_task_graph")
+def record_target_task_graph(task, taskgraph, scratch_pad, graph_config, parameters):
+    global _target_task_graph
+    if task is None and CACHE_STATS:
+        _target_task_graph = taskgraph
+
+
+@verifications.add("optimized_task_graph")
+def write_cache_stats(task, taskgraph, scratch_pad, graph_config, parameters):
+    # Only decision and action tasks publish artifacts.
+    if task is not None or not CACHE_STATS or "TASK_ID" not in os.environ:
+        return
+    # The stats are informational; never fail the decision over them.
+    try:
+        stats = get_cache_stats(_target_task_graph, taskgraph, graph_config, parameters)
+    except Exception:
+        logger.warning("Couldn't compute the cache stats", exc_info=True)
+        return
+    write_artifact("cache-stats.json", stats)
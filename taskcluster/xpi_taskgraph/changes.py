@@ -0,0 +1,93 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Find the XPIs a push or pull request affects, so that decision tasks only
+generate tasks for those.
+"""
+
+import logging
+import os
+import subprocess
+
+import yaml
+from taskgraph.util.vcs import get_repository
+from xpi_taskgraph.xpi_manifest import get_manifest_index
+
+logger = logging.getLogger(__name__)
+
+# Changes to these paths don't affect any task.
+IGNORED_PATHS = ("docs/", "CODE_OF_CONDUCT.md", "LICENSE", "README.md")
+# Top-level keys of config.yml that are only used by release promotion.
+IGNORED_CONFIG_KEYS = ("release-promotion",)
+
+
+def _split_config(config):
+    """Return the repositories in ``config``, and the rest of it that tasks
+    can depend on."""
+    config = dict(config)
+    taskgraph_config = dict(config.pop("taskgraph", {}))
+    repositories = taskgraph_config.pop("repositories", {})
+    config["taskgraph"] = taskgraph_config
+    for key in IGNORED_CONFIG_KEYS:
+        config.pop(key, None)
+    return repositories, config
+
+
+def _get_changed_repo_prefixes(repo, base_rev, config_path, graph_config):
+    """Return the repo-prefixes whose repository changed in config.yml since
+    ``base_rev``, or None if anything else in it changed."""
+    try:
+        old_config = yaml.safe_load(repo.run("show", f"{base_rev}:{config_path}"))
+    except subprocess.CalledProcessError:
+        return None
+    with open(os.path.join(graph_config.root_dir, "config.yml")) as f:
+        new_config = yaml.safe_load(f)
+    old_repositories, old_config = _split_config(old_config)
+    new_repositories, new_config = _split_config(new_config)
+    if old_config != new_config:
+        return None
+    return {
+        prefix
+        for prefix in old_repositories.keys() | new_repositories.keys()
+        if old_repositories.get(prefix) != new_repositories.get(prefix)
+    }
+
+
+def get_affected_xpis(graph_config, parameters):
+    """Return the sorted names of the XPIs whose manifest or repository in
+    config.yml changed in ``files_changed``.
+
+    Return None if anything every XPI depends on changed, like transforms or
+    docker images, in which case tasks are generated for all of them.
+    """
+    vcs_root = str(graph_config.vcs_root)
+    config_path = os.path.relpath(
+        os.path.join(graph_config.root_dir, "config.yml"), vcs_root
+    ).replace(os.sep, "/")
+    index = get_manifest_index()
+    affected = set()
+    for path in parameters["files_changed"]:
+        if path.startswith(IGNORED_PATHS):
+            continue
+        directory, name = os.path.split(path)
+        if directory == "manifests" and name.endswith(".yml"):
+            affected.add(name[: -len(".yml")])
+            continue
+        if path == config_path:
+            prefixes = _get_changed_repo_prefixes(
+                get_repository(vcs_root),
+                parameters["base_rev"],
+                config_path,
+                graph_config,
+            )
+            if prefixes is not None:
+                names = [index.names(repo_prefix=prefix) for prefix in prefixes]
+                # A repository without manifests is the manifest repository.
+                if all(names):
+                    affected.update(name for n in names for name in n)
+                    continue
+        logger.info(f"{path} changed: generating tasks for every XPI")
+        return None
+    logger.info(f"Generating tasks for the affected XPIs: {sorted(affected)}")
+    return sorted(affected)
@@ -0,0 +1,176 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Digests of the files and directories that cached tasks depend on.
+
+Kinds are generated in processes forked from the decision task, so digests
+computed before the kinds are loaded (see ``prime_digests``) are shared by
+all of them.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import stat
+
+import taskgraph
+from taskgraph.util.hash import hash_paths
+from taskgraph.util.keyed_by import evaluate_keyed_by
+from taskgraph.util.vcs import get_repository
+from taskgraph.util.verify import verifications
+from xpi_taskgraph.xpi_manifest import BASE_DIR, MANIFEST_DIR
+
+logger = logging.getLogger(__name__)
+
+# "git" uses the git object id of clean, tracked resources and falls back to
+# hashing the contents of anything else; "content" always hashes contents.
+DIGEST_BACKEND = os.environ.get("XPI_DIGEST_BACKEND", "git")
+
+
+def hash_string(data):
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class GitObjects:
+    """Git blob and tree ids of the clean, tracked paths in a repository.
+
+    Object ids are read from ``HEAD`` with a single ``git ls-tree`` call, so
+    looking up a directory doesn't read any of the files inside it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._repo = None
+        self._object_ids = None
+        self._dirty = None
+
+    def _load(self):
+        self._object_ids = {}
+        self._dirty = set()
+        try:
+            self._repo = get_repository(self.path)
+        except RuntimeError:
+            return
+        if self._repo.tool != "git":
+            self._repo = None
+            return
+        for entry in self._repo.run("ls-tree", "-r", "-t", "-z", "HEAD").split("\0"):
+            if entry:
+                info, path = entry.split("\t", 1)
+                self._object_ids[path] = info.split()[2]
+        status = self._repo.run("status", "--porcelain", "-z", "--untracked-files=all")
+        for entry in status.split("\0"):
+            # Renames and copies are followed by an entry with the source path.
+            if len(entry) > 3 and entry[2] == " ":
+                self._dirty.add(entry[3:])
+            elif entry:
+                self._dirty.add(entry)
+
+    def object_id(self, path):
+        """Return the object id for ``path``, or None if it isn't tracked or
+        it (or anything under it) has local changes."""
+        if self._object_ids is None:
+            self._load()
+        if not self._repo:
+            return None
+        relpath = os.path.relpath(path, self._repo.path).replace(os.sep, "/")
+        if relpath not in self._object_ids:
+            return None
+        prefix = relpath + "/"
+        if any(d == relpath or d.startswith(prefix) for d in self._dirty):
+            return None
+        return self._object_ids[relpath]
+
+
+class DigestCache:
+    """Resource digests keyed by ``(path, size, mtime_ns)``, so each
+    resource is hashed once no matter how many tasks depend on it.
+
+    ``computed`` counts the digests that were actually calculated rather
+    than reused or looked up in git.
+    """
+
+    def __init__(self, backend="content"):
+        self._digests = {}
+        self._git_objects = GitObjects(BASE_DIR) if backend == "git" else None
+        self.computed = 0
+
+    def digest(self, path):
+        if self._git_objects:
+            object_id = self._git_objects.object_id(path)
+            if object_id:
+                return f"git:{object_id}"
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            raise Exception(f"Unknown resource {path}")
+        key = (path, st.st_size, st.st_mtime_ns)
+        if key not in self._digests:
+            if stat.S_ISDIR(st.st_mode):
+                self._digests[key] = hash_paths(path, [""])
+            elif stat.S_ISREG(st.st_mode):
+                self._digests[key] = _hash_file(path)
+            else:
+                raise Exception(f"Unknown resource {path}")
+            self.computed += 1
+        return self._digests[key]
+
+
+digest_cache = DigestCache(DIGEST_BACKEND)
+
+
+# The parameters are verified right before the kinds are loaded, which makes
+# this the last chance to compute digests shared by all of them.
+@verifications.add("parameters")
+def prime_digests(parameters):
+    """Hash the resources the cached tasks being generated depend on: the
+    manifests of the XPIs they're generated for."""
+    if taskgraph.fast:
+        return
+    if parameters.get("xpi_name"):
+        names = [parameters["xpi_name"]]
+    else:
+        names = parameters.get("affected_xpis")
+    if names is None:
+        paths = glob.glob(os.path.join(MANIFEST_DIR, "*.yml"))
+    else:
+        paths = [os.path.join(MANIFEST_DIR, f"{name}.yml") for name in names]
+    for path in paths:
+        # Unknown XPIs are reported when their tasks are generated.
+        if os.path.isfile(path):
+            digest_cache.digest(path)
+    logger.info(f"Computed {digest_cache.computed} shared resource digest(s)")
+
+
+def get_graph_config_slices(graph_config, xpi_config, worker_type, kind, level):
+    """Return the parts of the graph config that a task for ``xpi_config``
+    depends on.
+
+    Cached tasks hash these instead of the whole of config.yml, so edits to
+    other repositories, worker aliases or notification lists don't
+    invalidate them.
+    """
+    slices = {
+        "trust-domain": graph_config["trust-domain"],
+        "scope-prefix": graph_config["scriptworker"]["scope-prefix"],
+        "repository": graph_config["taskgraph"]["repositories"][xpi_config.repo_prefix],
+        "worker-alias": graph_config["workers"]["aliases"].get(worker_type),
+        "signing-format": evaluate_keyed_by(
+            graph_config["scriptworker"]["signing-format"],
+            "signing-format",
+            {"xpi-type": xpi_config.addon_type, "kind": kind, "level": level},
+        ),
+    }
+    if xpi_config.private_repo:
+        slices["github-clone-secret"] = graph_config["github_clone_secret"]
+    return slices
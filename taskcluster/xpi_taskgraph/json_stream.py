@@ -0,0 +1,102 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Read the members of a large JSON object, like a `full-task-graph.json`, one at
+a time, without holding the whole document in memory.
+"""
+
+import codecs
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r"\s*")
+# What may follow a complete value.
+_DELIMITERS = frozenset(",:]} \t\n\r")
+
+
+class _Reader:
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Read at least as much as is buffered, so that values spanning
+        many chunks aren't decoded once per chunk. Return False at the end
+        of the input."""
+        if self._eof:
+            return False
+        buf = [self._buf[self._pos :]]
+        size = wanted = max(len(buf[0]), 1)
+        while size <= wanted:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                buf.append(self._decode(b"", final=True))
+                self._eof = True
+                break
+            buf.append(self._decode(chunk))
+            size += len(buf[-1])
+        self._buf = "".join(buf)
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _whitespace.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._read():
+                return
+
+    def expect(self, chars):
+        """Consume and return the next non-whitespace character, which must
+        be one of ``chars``."""
+        self._skip_whitespace()
+        if self._pos == len(self._buf):
+            raise ValueError(f"Expected one of {chars!r}, got the end of the input")
+        char = self._buf[self._pos]
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def peek(self):
+        self._skip_whitespace()
+        return self._buf[self._pos : self._pos + 1]
+
+    def value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # A number cut by a chunk, e.g. after its `.` or `e`, decodes
+            # to what was read so far; it's only complete once followed by a
+            # delimiter.
+            if (
+                end < len(self._buf) and self._buf[end] in _DELIMITERS
+            ) or not self._read():
+                self._pos = end
+                return value
+
+
+def iter_object_items(chunks):
+    """Yield the keys and values of the JSON object made of the bytes in
+    ``chunks``, decoding a single value at a time."""
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError(f"Expected an object key, got {key!r}")
+        reader.expect(":")
+        yield key, reader.value()
+        if reader.expect(",}") == "}":
+            return
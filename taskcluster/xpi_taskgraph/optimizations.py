@@ -0,0 +1,37 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+
+from taskgraph.optimize.base import register_strategy
+from taskgraph.optimize.strategies import IndexSearch
+from taskgraph.util.verify import verifications
+
+
+@register_strategy("skip-if-indexed")
+class SkipIfIndexed(IndexSearch):
+    """Remove a task if one of the given index paths has a task that
+    completed.
+
+    Unlike `index-search`, this works for tasks whose dependencies still run,
+    such as tests of a release build. Nothing may depend on these tasks, as
+    they are removed rather than replaced with the indexed task; see
+    `verify_skip_if_indexed`.
+    """
+
+    def should_remove_task(self, task, params, index_paths):
+        return bool(self.should_replace_task(task, params, None, index_paths))
+
+
+@verifications.add("full_task_graph")
+def verify_skip_if_indexed(task, taskgraph, scratch_pad, graph_config, parameters):
+    """Make sure no task depends on a task that `skip-if-indexed` may remove."""
+    if task is None:
+        return
+    for dep_label in task.dependencies.values():
+        optimization = taskgraph.tasks[dep_label].optimization or {}
+        if "skip-if-indexed" in optimization:
+            raise Exception(
+                f"{task.label} depends on {dep_label}, which uses the "
+                "skip-if-indexed optimization and may be removed"
+            )
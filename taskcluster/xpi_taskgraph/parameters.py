@@ -8,11 +8,13 @@ from typing import Literal, Optional
 from mozilla_version.version import BaseVersion
 from taskgraph.parameters import extend_parameters_schema
 from taskgraph.util.schema import Schema
+from xpi_taskgraph.changes import get_affected_xpis
 
 
 # Please keep this list sorted
 class XpiParameters(Schema, rename=None, forbid_unknown_fields=False, kw_only=True):
     additional_shipit_emails: Optional[list[str]] = None
+    affected_xpis: Optional[list[str]] = None
     app_version: Optional[str] = None
     next_version: Optional[str] = None
     shipping_phase: Optional[Literal["build", "promote", "ship"]] = None
@@ -26,6 +28,13 @@ extend_parameters_schema(XpiParameters)
 def decision_parameters(graph_config, parameters):
     # Change this to only build a specific xpi during testing.
     parameters["xpi_name"] = None
+    # Only generate tasks for the XPIs a push or pull request changed.
+    parameters["affected_xpis"] = None
+    if graph_config.get("only-affected-xpis") and parameters["tasks_for"] in (
+        "github-pull-request",
+        "github-push",
+    ):
+        parameters["affected_xpis"] = get_affected_xpis(graph_config, parameters)
     if version := parameters.get("version"):
         parameters["app_version"] = version
         parameters["next_version"] = str(
@@ -0,0 +1,169 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Opt-in profiling of transforms, enabled by setting XPI_PROFILE_TRANSFORMS.
+
+Every transform run for every kind, including the ones from taskgraph, records
+its own wall time, the number of tasks it took in and yielded and the peak
+memory it allocated while it ran, on top of what was allocated when it
+resumed. The results are written to
+`transform-profile.json` next to `full-task-graph.json`.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import tracemalloc
+
+from taskgraph.decision import ARTIFACTS_DIR, write_artifact
+from taskgraph.transforms.base import TransformSequence
+from taskgraph.util.verify import verifications
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TRANSFORMS = bool(os.environ.get("XPI_PROFILE_TRANSFORMS"))
+
+# Kinds are loaded in forked processes, so each writes its own results here
+# to be merged once the full task graph is known.
+PARTIAL_DIR = ARTIFACTS_DIR / "transform-profile"
+
+
+class _Profiler:
+    """Attributes time and memory to the innermost running transform.
+
+    Transforms are generators feeding into each other, so a transform is
+    only charged between the points where it resumes and where it either
+    yields or pulls a task from the transform before it.
+    """
+
+    def __init__(self):
+        self.kinds = {}
+        self._stack = []
+        self._last = None
+        self._baseline = 0
+
+    def add(self, kind, name):
+        stats = {
+            "name": name,
+            "seconds": 0.0,
+            "tasks-in": 0,
+            "tasks-out": 0,
+            "peak-memory": 0,
+        }
+        self.kinds.setdefault(kind, []).append(stats)
+        return stats
+
+    def _switch(self):
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            stats = self._stack[-1]
+            stats["seconds"] += now - self._last
+            stats["peak-memory"] = max(stats["peak-memory"], peak - self._baseline)
+        tracemalloc.reset_peak()
+        self._baseline = current
+        self._last = now
+
+    def push(self, stats):
+        self._switch()
+        self._stack.append(stats)
+
+    def pop(self):
+        self._switch()
+        self._stack.pop()
+
+
+_profiler = _Profiler()
+
+
+class _ProfiledTransform:
+    """Iterate over the tasks yielded by ``xform``, which is only called
+    when the first task is requested so its setup is charged to it too."""
+
+    def __init__(self, stats, xform, config, items):
+        self.stats = stats
+        self._xform = xform
+        self._config = config
+        self._inputs = items
+        self._items = None
+
+    def _count_inputs(self):
+        for item in self._inputs:
+            self.stats["tasks-in"] += 1
+            yield item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        _profiler.push(self.stats)
+        try:
+            if self._items is None:
+                if self._xform is None:
+                    items = self._count_inputs()
+                else:
+                    items = self._xform(self._config, self._count_inputs())
+                    if items is None:
+                        raise Exception(f"Transform {self._xform} is not a generator")
+                self._items = iter(items)
+            item = next(self._items)
+        finally:
+            _profiler.pop()
+        self.stats["tasks-out"] += 1
+        return item
+
+
+def _get_name(xform):
+    if not hasattr(xform, "__name__"):
+        xform = type(xform)
+    return f"{xform.__module__}:{xform.__qualname__}"
+
+
+def _write_partial(kind, items):
+    yield from items
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    with open(PARTIAL_DIR / f"{kind}.json", "w") as f:
+        json.dump(_profiler.kinds.get(kind, []), f)
+
+
+def _profiled_call(self, config, items):
+    outermost = not isinstance(items, _ProfiledTransform)
+    if outermost:
+        # Charge the kind's loader for generating the initial tasks.
+        items = _ProfiledTransform(
+            _profiler.add(config.kind, "loader"), None, None, items
+        )
+    for xform in self._transforms:
+        if isinstance(xform, TransformSequence):
+            items = xform(config, items)
+        else:
+            stats = _profiler.add(config.kind, _get_name(xform))
+            items = _ProfiledTransform(stats, xform, config, items)
+    if outermost:
+        return _write_partial(config.kind, items)
+    return items
+
+
+def enable():
+    """Profile every transform if XPI_PROFILE_TRANSFORMS is set."""
+    if not PROFILE_TRANSFORMS:
+        return
+    shutil.rmtree(PARTIAL_DIR, ignore_errors=True)
+    tracemalloc.start()
+    TransformSequence.__call__ = _profiled_call
+    logger.info("Profiling transforms")
+
+
+@verifications.add("full_task_graph")
+def write_transform_profile(task, taskgraph, scratch_pad, graph_config, parameters):
+    if task is not None or not PROFILE_TRANSFORMS:
+        return
+    kinds = {}
+    for name in sorted(os.listdir(PARTIAL_DIR)):
+        with open(PARTIAL_DIR / name) as f:
+            kinds[os.path.splitext(name)[0]] = json.load(f)
+    shutil.rmtree(PARTIAL_DIR)
+    write_artifact("transform-profile.json", kinds)
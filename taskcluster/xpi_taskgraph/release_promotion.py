@@ -2,39 +2,46 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
+import requests
 from mozilla_version.version import BaseVersion
+from redo import retry
 from taskgraph.actions.registry import register_callback_action
 from taskgraph.config import GraphConfig
 from taskgraph.decision import taskgraph_decision
 from taskgraph.parameters import Parameters
-from taskgraph.taskgraph import TaskGraph
-from taskgraph.util.taskcluster import get_artifact
-from taskgraph.util.taskgraph import (
-    find_decision_task,
-    find_existing_tasks_from_previous_kinds,
-)
+from taskgraph.util.taskcluster import get_artifact, get_artifact_url, get_session
+from taskgraph.util.taskgraph import find_decision_task
+from taskcluster.exceptions import TaskclusterConnectionError
 
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.artifact_cache import artifact_cache
+from xpi_taskgraph.json_stream import iter_object_items
+from xpi_taskgraph.xpi_manifest import get_manifest_index
 
 RELEASE_PROMOTION_PROJECTS = (
     "https://github.com/mozilla-extensions/xpi-manifest",
     "https://github.com/mozilla-releng/staging-xpi-manifest",
 )
 
+# Maximum number of artifacts downloaded from previous graphs at once.
+FETCH_JOBS = 4
+# Size of the chunks full task graphs are read in.
+CHUNK_SIZE = 64 * 1024
+
 
 def is_release_promotion_available(parameters):
     return parameters["head_repository"] in RELEASE_PROMOTION_PROJECTS
 
 
 def build_schema(system: bool, graph_config: GraphConfig):
-    manifests = get_manifest()
-    xpi_names = [
-        xpi
-        for xpi, manifest in manifests.items()
-        if (manifest["addon-type"] == "system") is system
-    ]
+    index = get_manifest_index()
+    system_names = index.names(addon_type="system")
+    if system:
+        xpi_names = system_names
+    else:
+        xpi_names = sorted(set(index.names()) - set(system_names))
 
     promotion_flavors = list(graph_config["release-promotion"]["flavors"].keys())
     if system:
@@ -115,6 +122,83 @@ def build_schema(system: bool, graph_config: GraphConfig):
     }
 
 
+def _retry(func, *args):
+    return retry(
+        func,
+        attempts=3,
+        sleeptime=5,
+        retry_exceptions=(requests.RequestException, TaskclusterConnectionError),
+        args=args,
+    )
+
+
+def _fetch_artifact(task_id, path):
+    # Artifacts never change once a task has created them.
+    return artifact_cache.fetch(
+        f"artifact/{task_id}/{path}", partial(_retry, get_artifact, task_id, path)
+    )
+
+
+def _stream_xpi_tasks(task_id, xpi_name):
+    response = get_session().get(
+        get_artifact_url(task_id, "public/full-task-graph.json"), stream=True
+    )
+    response.raise_for_status()
+    with response:
+        return {
+            label: task
+            for label, task in iter_object_items(response.iter_content(CHUNK_SIZE))
+            if task["attributes"].get("xpi-name", xpi_name) == xpi_name
+        }
+
+
+def _fetch_xpi_tasks(task_id, xpi_name):
+    """Return the tasks of ``task_id``'s full task graph that are for
+    ``xpi_name`` or shared by all XPIs, like docker images.
+
+    The graph is read as it's downloaded, so only those tasks are ever held
+    in memory.
+    """
+    return artifact_cache.fetch(
+        f"xpi-tasks/{task_id}/{xpi_name}",
+        partial(_retry, _stream_xpi_tasks, task_id, xpi_name),
+    )
+
+
+def fetch_previous_graphs(previous_graph_ids, xpi_name):
+    """Return the parameters of the first of ``previous_graph_ids``, and the
+    tasks relevant to ``xpi_name`` and label-to-taskid mappings of all of
+    them, in the same order."""
+    with ThreadPoolExecutor(max_workers=FETCH_JOBS) as executor:
+        parameters = executor.submit(
+            _fetch_artifact, previous_graph_ids[0], "public/parameters.yml"
+        )
+        xpi_tasks = executor.map(
+            partial(_fetch_xpi_tasks, xpi_name=xpi_name), previous_graph_ids
+        )
+        label_to_taskids = executor.map(
+            partial(_fetch_artifact, path="public/label-to-taskid.json"),
+            previous_graph_ids,
+        )
+        return parameters.result(), list(xpi_tasks), list(label_to_taskids)
+
+
+def find_existing_tasks(tasks, label_to_taskids, rebuild_kinds):
+    """Like `find_existing_tasks_from_previous_kinds`, for the JSON ``tasks``
+    of the previous graphs and with their label-to-taskid mappings already
+    fetched."""
+    kind_labels = {
+        label
+        for label, task in tasks.items()
+        if task["attributes"]["kind"] not in rebuild_kinds
+    }
+    existing_tasks = {}
+    for label_to_taskid in label_to_taskids:
+        for label in set(label_to_taskid or {}).intersection(kind_labels):
+            existing_tasks[label] = label_to_taskid[label]
+    return existing_tasks
+
+
 @register_callback_action(
     name="release-promotion",
     title="Promote an XPI",
@@ -160,20 +244,22 @@ def release_promotion_action(parameters, graph_config, input, task_group_id, tas
     if not previous_graph_ids:
         previous_graph_ids = [find_decision_task(parameters, graph_config)]
 
-    # Download parameters from the first decision task
-    parameters = get_artifact(previous_graph_ids[0], "public/parameters.yml")
-    # Download and combine full task graphs from each of the previous_graph_ids.
-    # Sometimes previous relpro action tasks will add tasks, like partials,
-    # that didn't exist in the first full_task_graph, so combining them is
-    # important. The rightmost graph should take precedence in the case of
-    # conflicts.
-    combined_full_task_graph = {}
-    for graph_id in previous_graph_ids:
-        full_task_graph = get_artifact(graph_id, "public/full-task-graph.json")
-        combined_full_task_graph.update(full_task_graph)
-    _, combined_full_task_graph = TaskGraph.from_json(combined_full_task_graph)
-    parameters["existing_tasks"] = find_existing_tasks_from_previous_kinds(
-        combined_full_task_graph, previous_graph_ids, rebuild_kinds
+    # Download parameters from the first decision task, and the tasks for
+    # this XPI and label-to-taskid mappings of each of the previous_graph_ids,
+    # concurrently. They're cached, so later actions on the same graphs
+    # don't download them again.
+    parameters, xpi_tasks, label_to_taskids = fetch_previous_graphs(
+        previous_graph_ids, input["xpi_name"]
+    )
+    # Combine the full task graphs. Sometimes previous relpro action tasks
+    # will add tasks, like partials, that didn't exist in the first
+    # full_task_graph, so combining them is important. The rightmost graph
+    # should take precedence in the case of conflicts.
+    combined_tasks = {}
+    for tasks in xpi_tasks:
+        combined_tasks.update(tasks)
+    parameters["existing_tasks"] = find_existing_tasks(
+        combined_tasks, label_to_taskids, rebuild_kinds
     )
     parameters["do_not_optimize"] = do_not_optimize
     parameters["target_tasks_method"] = target_tasks_method
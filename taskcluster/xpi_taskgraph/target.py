@@ -3,34 +3,61 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+from collections import defaultdict
+
 from taskgraph.target_tasks import register_target_task
 
+# The graph the shipping-phase index was last built for, and the index.
+_shipping_phase_index = (None, None)
+
+
+def get_shipping_phase_index(full_task_graph):
+    """Return the labels of the tasks in ``full_task_graph`` by
+    shipping-phase, only going through the graph once."""
+    global _shipping_phase_index
+    graph, index = _shipping_phase_index
+    if graph is not full_task_graph:
+        index = defaultdict(list)
+        for label, task in full_task_graph.tasks.items():
+            phase = task.attributes.get("shipping-phase")
+            if phase:
+                index[phase].append(label)
+        _shipping_phase_index = (full_task_graph, index)
+    return index
+
+
+def target_tasks_for_flavor(full_task_graph, graph_config, flavor):
+    """Select the tasks of the shipping-phases of the release promotion
+    ``flavor``, as listed in config.yml."""
+    phases = graph_config["release-promotion"]["flavors"][flavor]["shipping-phases"]
+    index = get_shipping_phase_index(full_task_graph)
+    return [label for phase in phases for label in index.get(phase, [])]
+
+
+@register_target_task("shipping_phases")
+def target_tasks_shipping_phases(full_task_graph, parameters, graph_config):
+    """Select the set of tasks required for the release promotion flavor
+    given by the `shipping_phase` parameter."""
+    return target_tasks_for_flavor(
+        full_task_graph, graph_config, parameters["shipping_phase"]
+    )
 
+
+# The methods used by release promotion before flavors listed their
+# shipping-phases, which older graphs' parameters still refer to.
 @register_target_task("ship_xpi")
 def target_tasks_ship_xpi(full_task_graph, parameters, graph_config):
     """Select the set of tasks required for releasing a xpi."""
-
-    def filter(task, parameters):
-        return task.attributes.get("shipping-phase") in ("build", "promote", "ship")
-
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+    return target_tasks_for_flavor(full_task_graph, graph_config, "ship")
 
 
 @register_target_task("promote_xpi")
 def target_tasks_promote_xpi(full_task_graph, parameters, graph_config):
     """Select the set of tasks required for promoting a xpi."""
-
-    def filter(task, parameters):
-        return task.attributes.get("shipping-phase") in ("build", "promote")
-
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+    return target_tasks_for_flavor(full_task_graph, graph_config, "promote")
 
 
 @register_target_task("build_xpi")
 def target_tasks_build_xpi(full_task_graph, parameters, graph_config):
     """Select the set of tasks required for promoting a xpi."""
-
-    def filter(task, parameters):
-        return task.attributes.get("shipping-phase") in ("build",)
-
-    return [l for l, t in full_task_graph.tasks.items() if filter(t, parameters)]
+    return target_tasks_for_flavor(full_task_graph, graph_config, "build")
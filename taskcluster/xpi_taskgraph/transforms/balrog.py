@@ -7,7 +7,7 @@ from taskgraph.transforms.base import TransformSequence
 from taskgraph.util.dependencies import get_primary_dependency
 from taskgraph.util.schema import resolve_keyed_by
 from voluptuous import ALLOW_EXTRA, Required, Schema
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 transforms = TransformSequence()
 schema = Schema(
@@ -24,8 +24,6 @@ transforms.add_validate(schema)
 
 @transforms.add
 def add_balrog_worker_config(config, tasks):
-    manifest = get_manifest()
-
     for task in tasks:
         if not (
             config.params.get("version")
@@ -36,13 +34,13 @@ def add_balrog_worker_config(config, tasks):
         ):
             continue
         xpi_name = config.params["xpi_name"]
-        xpi_manifest = manifest[xpi_name]
+        xpi_manifest = get_manifest_entry(xpi_name)
 
         # if this isn't enabled in the manifest, no need to create balrog task
-        if not xpi_manifest.get("enable-balrog", False):
+        if not xpi_manifest.enable_balrog:
             continue
 
-        xpi_addon_type = xpi_manifest["addon-type"]
+        xpi_addon_type = xpi_manifest.addon_type
         xpi_version = config.params["version"]
         build_number = config.params["build_number"]
         release_name = "{xpi_name}-{xpi_version}-build{build_number}".format(
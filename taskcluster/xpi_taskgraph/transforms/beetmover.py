@@ -9,7 +9,7 @@ from taskgraph.transforms.base import TransformSequence
 from taskgraph.util.dependencies import get_primary_dependency
 from taskgraph.util.schema import resolve_keyed_by
 from voluptuous import ALLOW_EXTRA, Required, Schema
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 transforms = TransformSequence()
 schema = Schema(
@@ -26,7 +26,6 @@ transforms.add_validate(schema)
 
 @transforms.add
 def add_beetmover_worker_config(config, tasks):
-    manifest = get_manifest()
     for task in tasks:
         if not (
             config.params.get("version")
@@ -37,8 +36,8 @@ def add_beetmover_worker_config(config, tasks):
         ):
             continue
         xpi_name = config.params["xpi_name"]
-        xpi_manifest = manifest[xpi_name]
-        xpi_addon_type = xpi_manifest["addon-type"]
+        xpi_manifest = get_manifest_entry(xpi_name)
+        xpi_addon_type = xpi_manifest.addon_type
         build_number = config.params["build_number"]
         xpi_version = config.params["version"]
         release_name = ("{xpi_name}-{xpi_version}-build{build_number}").format(
@@ -47,7 +46,7 @@ def add_beetmover_worker_config(config, tasks):
             build_number=build_number,
         )
         xpi_destinations = []
-        for artifact in xpi_manifest["artifacts"]:
+        for artifact in xpi_manifest.artifacts:
             artifact_name = basename(artifact)
             xpi_destination = (
                 "pub/system-addons/{xpi_name}/{release_name}/{artifact_name}"
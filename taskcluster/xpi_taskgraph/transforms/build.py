@@ -7,72 +7,86 @@ kind.
 """
 
 import os
-from copy import deepcopy
 
 from taskgraph.transforms.base import TransformSequence
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry, get_manifest_index
 
 transforms = TransformSequence()
 
 
+def _own(parent, key, factory=dict):
+    """Replace ``parent[key]`` with a shallow copy that is safe to modify.
+
+    Tasks share everything they don't modify with the kind's task template,
+    so only the containers written to for each XPI get copied.
+    """
+    parent[key] = factory(parent.get(key, factory()))
+    return parent[key]
+
+
 @transforms.add
 def tasks_from_manifest(config, tasks):
-    manifest = get_manifest()
     xpi_name = config.params.get("xpi_name")
     xpi_revision = None
     if xpi_name:
         xpi_revision = config.params.get("xpi_revision")
+        xpi_configs = [get_manifest_entry(xpi_name)]
+    else:
+        xpi_configs = get_manifest_index().query(active=True)
+        if config.params.get("affected_xpis") is not None:
+            affected_xpis = set(config.params["affected_xpis"])
+            xpi_configs = [c for c in xpi_configs if c.manifest_name in affected_xpis]
     for task_raw in tasks:
-        for xpi_config in manifest.values():
-            if not xpi_config.get("active"):
-                continue
-            if xpi_name and xpi_config["manifest_name"] != xpi_name:
+        for xpi_config in xpi_configs:
+            if not xpi_config.active:
                 continue
-            task = deepcopy(task_raw)
-            env = task.setdefault("worker", {}).setdefault("env", {})
-            run = task.setdefault("run", {})
-            checkout = run.setdefault("checkout", {})
-            checkout_config = checkout.setdefault(xpi_config["repo-prefix"], {})
-            env["REPO_PREFIX"] = xpi_config["repo-prefix"]
+            task = dict(task_raw)
+            worker = _own(task, "worker")
+            env = _own(worker, "env")
+            run = _own(task, "run")
+            checkout = _own(run, "checkout")
+            checkout_config = _own(checkout, xpi_config.repo_prefix)
+            env["REPO_PREFIX"] = xpi_config.repo_prefix
             checkout_config["path"] = "/builds/worker/checkouts/vcs"
-            if "branch" in xpi_config:
-                checkout_config["head_ref"] = xpi_config["branch"]
-            if "directory" in xpi_config:
-                run["cwd"] = "{checkout}/%s" % xpi_config["directory"]
+            if xpi_config.branch:
+                checkout_config["head_ref"] = xpi_config.branch
+            if xpi_config.directory:
+                run["cwd"] = "{checkout}/%s" % xpi_config.directory
             if xpi_revision:
                 checkout_config["head_rev"] = xpi_revision
-            task["label"] = "{}-{}".format(config.kind, xpi_config["manifest_name"])
-            env["XPI_NAME"] = xpi_config["manifest_name"]
-            task.setdefault("extra", {})["xpi-name"] = xpi_config["manifest_name"]
-            env["XPI_TYPE"] = xpi_config["addon-type"]
-            if xpi_config.get("private-repo"):
+            task["label"] = "{}-{}".format(config.kind, xpi_config.manifest_name)
+            env["XPI_NAME"] = xpi_config.manifest_name
+            _own(task, "extra")["xpi-name"] = xpi_config.manifest_name
+            env["XPI_TYPE"] = xpi_config.addon_type
+            if xpi_config.private_repo:
                 checkout_config["ssh_secret_name"] = config.graph_config[
                     "github_clone_secret"
                 ]
                 artifact_prefix = "xpi/build"
                 repo_url = config.graph_config["taskgraph"]["repositories"][
-                    xpi_config["repo-prefix"]
+                    xpi_config.repo_prefix
                 ]["default-repository"]
                 if repo_url.startswith("https"):
                     raise Exception(
-                        f"{xpi_config['manifest_name']} is a private repo but {repo_url} is a public url!\n"
+                        f"{xpi_config.manifest_name} is a private repo but {repo_url} is a public url!\n"
                         "Use the git@github.com:ORG/REPO url format.\n"
                         "(See https://github.com/mozilla-extensions/xpi-manifest/blob/master/docs/adding-a-new-xpi.md#enabling-releases)"
                     )
             else:
                 artifact_prefix = "public/build"
             env["ARTIFACT_PREFIX"] = artifact_prefix
-            if xpi_config.get("install-type"):
-                env["XPI_INSTALL_TYPE"] = xpi_config["install-type"]
-            task.setdefault("attributes", {})["addon-type"] = xpi_config["addon-type"]
-            task["attributes"]["xpi-name"] = xpi_config["manifest_name"]
-            task.setdefault("attributes", {})["xpis"] = {}
+            if xpi_config.install_type:
+                env["XPI_INSTALL_TYPE"] = xpi_config.install_type
+            attributes = _own(task, "attributes")
+            attributes["addon-type"] = xpi_config.addon_type
+            attributes["xpi-name"] = xpi_config.manifest_name
+            attributes["xpis"] = {}
 
-            if "docker-image" in xpi_config:
-                task["worker"]["docker-image"]["in-tree"] = xpi_config["docker-image"]
+            if xpi_config.docker_image:
+                _own(worker, "docker-image")["in-tree"] = xpi_config.docker_image
 
-            artifacts = task.setdefault("worker", {}).setdefault("artifacts", [])
-            for artifact in xpi_config["artifacts"]:
+            artifacts = _own(worker, "artifacts", list)
+            for artifact in xpi_config.artifacts:
                 artifact_name = "{}/{}".format(
                     artifact_prefix, os.path.basename(artifact)
                 )
@@ -83,8 +97,8 @@ def tasks_from_manifest(config, tasks):
                         "path": "/builds/worker/artifacts",
                     }
                 )
-                task["attributes"]["xpis"][artifact] = artifact_name
-            env["XPI_ARTIFACTS"] = ";".join(xpi_config["artifacts"])
-            env.update(xpi_config.get("build-env", {}))
+                attributes["xpis"][artifact] = artifact_name
+            env["XPI_ARTIFACTS"] = ";".join(xpi_config.artifacts)
+            env.update(xpi_config.build_env)
 
             yield task
@@ -7,27 +7,36 @@ Build the cached_task digest to prevent rerunning tasks if the code hasn't chang
 
 
 import json
+import logging
 import os
+import re
 
 import taskgraph
 from taskgraph.transforms.base import TransformSequence
-from taskgraph.util.hash import hash_path, hash_paths
-from xpi_taskgraph.xpi_manifest import MANIFEST_DIR, ROOT
+from xpi_taskgraph.digests import (
+    digest_cache,
+    get_graph_config_slices,
+    hash_string,
+)
+from xpi_taskgraph.xpi_manifest import MANIFEST_DIR, get_manifest_entry
+
+logger = logging.getLogger(__name__)
 
 transforms = TransformSequence()
 
 BASE_DIR = os.getcwd()
 
+PINNED_REVISION = re.compile("^[0-9a-f]{40}$")
+
 
 @transforms.add
 def add_resources(config, tasks):
     for task in tasks:
         resources = set(task.pop("resources", []))
-        resources.update({
-            os.path.join(MANIFEST_DIR, "{}.yml".format(task["extra"]["xpi-name"])),
-            os.path.join(ROOT, "config.yml"),
-        })
-        resources = list(resources)
+        resources.add(
+            os.path.join(MANIFEST_DIR, "{}.yml".format(task["extra"]["xpi-name"]))
+        )
+        resources = sorted(resources)
         attributes = task.setdefault("attributes", {})
         if attributes.get("resources") is not None:
             if resources and attributes["resources"] != resources:
@@ -45,37 +54,69 @@ def add_resources(config, tasks):
 
 @transforms.add
 def build_cache(config, tasks):
+    computed = digest_cache.computed
+    cache_tasks = config.params["tasks_for"] in ("github-pull-request", "github-push")
+    xpi_revision = config.params.get("xpi_revision") or ""
     for task in tasks:
-        # Only cache tasks on PRs and push. Ignore actions.
-        if config.params["tasks_for"] not in ("github-pull-request", "github-push"):
+        # Only cache tasks on PRs and push. Actions build a revision of the
+        # XPI's own repository, so there we only record the digest of the
+        # task's inputs (for post-build tasks to reuse) when it's pinned.
+        if not cache_tasks and not PINNED_REVISION.match(xpi_revision):
             yield task
             continue
         if task.get("cache", True) and not taskgraph.fast:
-            digest_data = []
-            digest_data.append(
-                json.dumps(
+            xpi_name = task["extra"]["xpi-name"]
+            inputs = {
+                "digest-extra": json.dumps(
                     task.get("attributes", {}).get("digest-extra", {}),
                     indent=2,
                     sort_keys=True,
-                )
-            )
+                ),
+                # Only hash the parts of config.yml this task depends on.
+                "config.yml": json.dumps(
+                    get_graph_config_slices(
+                        config.graph_config,
+                        get_manifest_entry(xpi_name),
+                        task["worker-type"],
+                        config.kind,
+                        config.params["level"],
+                    ),
+                    indent=2,
+                    sort_keys=True,
+                ),
+            }
             resources = task["attributes"]["resources"]
             for resource in resources:
                 path = os.path.join(BASE_DIR, resource)
-                if os.path.isdir(resource):
-                    digest_data.append(hash_paths(path, [""]))
-                elif os.path.isfile(resource):
-                    digest_data.append(hash_path(path))
-                else:
-                    raise Exception(f"Unknown resource {resource}")
-            cache_name = task["name"].replace(":", "-")
-            task["cache"] = {
-                "type": f"xpi-manifest.v1.{config.kind}",
-                "name": cache_name,
-                "digest-data": digest_data,
+                inputs[os.path.relpath(path, BASE_DIR)] = digest_cache.digest(path)
+            digest_data = list(inputs.values())
+            if cache_tasks:
+                # Build tasks are all named after the kind's one task, so
+                # add the XPI to give each its own `latest` index route.
+                cache_name = task["name"].replace(":", "-")
+                if cache_name != xpi_name:
+                    cache_name = f"{cache_name}-{xpi_name}"
+                task["cache"] = {
+                    "type": f"xpi-manifest.v1.{config.kind}",
+                    "name": cache_name,
+                    "digest-data": list(digest_data),
+                }
+            else:
+                inputs["xpi-revision"] = xpi_revision
+                digest_data.append(xpi_revision)
+            task["attributes"]["inputs-digest"] = hash_string("\n".join(digest_data))
+            # Recorded in the task definition so `cache-stats.json` can tell
+            # which input changed since the last indexed task.
+            task["extra"]["cache-inputs"] = {
+                name: hash_string(data) for name, data in inputs.items()
             }
 
         yield task
+    logger.info(
+        "Computed {} resource digest(s) for kind {}".format(
+            digest_cache.computed - computed, config.kind
+        )
+    )
 
 
 @transforms.add
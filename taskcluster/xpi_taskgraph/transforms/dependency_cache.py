@@ -0,0 +1,64 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Set up the caches used by tasks that install an XPI's dependencies (see
+docker/node/dependency_cache.py).
+"""
+
+from taskgraph.transforms.base import TransformSequence
+from xpi_taskgraph.transforms.fetch_deps import PACKAGE_CACHE_ARTIFACT
+
+transforms = TransformSequence()
+
+CACHE_NAME = "xpi-dependencies"
+MOUNT_POINT = "/builds/worker/.cache"
+# Where fetch-content extracts the package cache from the fetch-deps task.
+PACKAGE_CACHE = "/builds/worker/fetches/package-cache"
+
+
+def is_release_build(config, task):
+    return config.params["tasks_for"] == "action" and task["worker"].get(
+        "chain-of-trust"
+    )
+
+
+@transforms.add
+def add_dependency_cache(config, tasks):
+    # Untrusted tasks could put anything in the cache for others to use.
+    untrusted = config.params["level"] == "1" or config.params.is_try()
+    for task in tasks:
+        # Release builds always install their dependencies from scratch.
+        if untrusted or is_release_build(config, task):
+            yield task
+            continue
+        task["worker"].setdefault("caches", []).append(
+            {
+                "type": "persistent",
+                "name": CACHE_NAME,
+                "mount-point": MOUNT_POINT,
+                "skip-untrusted": True,
+            }
+        )
+        task["worker"].setdefault("env", {})[
+            "XPI_DEPENDENCY_CACHE"
+        ] = f"{MOUNT_POINT}/node-modules"
+        yield task
+
+
+@transforms.add
+def use_package_cache(config, tasks):
+    """Install dependencies from the packages downloaded by the XPI's
+    fetch-deps task, rather than from the registry."""
+    for task in tasks:
+        # fetch-deps tasks aren't part of the chain of trust, so release
+        # builds can't use what they download.
+        if is_release_build(config, task):
+            yield task
+            continue
+        label = "fetch-deps-{}".format(task["extra"]["xpi-name"])
+        if label in config.kind_dependencies_tasks:
+            task.setdefault("dependencies", {})["fetch-deps"] = label
+            task.setdefault("fetches", {})["fetch-deps"] = [PACKAGE_CACHE_ARTIFACT]
+            task["worker"].setdefault("env", {})["XPI_PACKAGE_CACHE"] = PACKAGE_CACHE
+        yield task
@@ -0,0 +1,42 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+Turn the tasks created from the manifests by the build transforms into tasks
+publishing the packages each XPI depends on, for its build and test tasks to
+install from.
+
+The lockfiles live in the XPIs' repositories, so these tasks are cached on
+the XPI's manifest and config like builds are, not on its lockfile. After a
+lockfile changes, a reused package cache may lack some packages; installs
+only prefer the cache, and download whatever is missing from the registry.
+"""
+
+from taskgraph.transforms.base import TransformSequence
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
+
+transforms = TransformSequence()
+
+PACKAGE_CACHE_ARTIFACT = "package-cache.tar.zst"
+
+
+@transforms.add
+def fetch_deps_tasks(config, tasks):
+    for task in tasks:
+        xpi_config = get_manifest_entry(task["extra"]["xpi-name"])
+        # mach builds install their own dependencies.
+        if xpi_config.install_type == "mach":
+            continue
+        worker = task["worker"]
+        del worker["env"]["XPI_ARTIFACTS"]
+        del task["attributes"]["xpis"]
+        artifact_prefix = worker["env"]["ARTIFACT_PREFIX"]
+        task["attributes"]["artifact_prefix"] = artifact_prefix
+        worker["artifacts"] = [
+            {
+                "type": "directory",
+                "name": artifact_prefix,
+                "path": "/builds/worker/artifacts",
+            }
+        ]
+        yield task
@@ -6,47 +6,50 @@ Apply some defaults and minor modifications to the tasks defined in the build
 kind.
 """
 
+import json
 import os
 
+import taskgraph
 from taskgraph.transforms.base import TransformSequence
+from taskgraph.util.cached_tasks import add_optimization
 from taskgraph.util.dependencies import get_primary_dependency
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.digests import hash_string
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 transforms = TransformSequence()
 
 
 @transforms.add
 def test_tasks_from_manifest(config, tasks):
-    manifest = get_manifest()
     for task in tasks:
         dep = get_primary_dependency(config, task)
         xpi_name = dep.attributes["xpi-name"]
         xpi_revision = config.params.get("xpi_revision")
         task.setdefault("extra", {})["xpi-name"] = xpi_name
 
-        xpi_config = manifest[xpi_name]
-        if not xpi_config.get("active"):
+        xpi_config = get_manifest_entry(xpi_name)
+        if not xpi_config.active:
             continue
 
-        if config.kind == "test" and not xpi_config.get("enable-test", True):
+        if config.kind == "test" and not xpi_config.enable_test:
             continue
 
         env = task.setdefault("worker", {}).setdefault("env", {})
         run = task.setdefault("run", {})
         checkout = run.setdefault("checkout", {})
-        checkout_config = checkout.setdefault(xpi_config["repo-prefix"], {})
-        env["REPO_PREFIX"] = xpi_config["repo-prefix"]
+        checkout_config = checkout.setdefault(xpi_config.repo_prefix, {})
+        env["REPO_PREFIX"] = xpi_config.repo_prefix
         checkout_config["path"] = "/builds/worker/checkouts/vcs"
-        if "branch" in xpi_config:
-            checkout_config["head_ref"] = xpi_config["branch"]
-        if "directory" in xpi_config:
-            run["cwd"] = "{checkout}/%s" % xpi_config["directory"]
+        if xpi_config.branch:
+            checkout_config["head_ref"] = xpi_config.branch
+        if xpi_config.directory:
+            run["cwd"] = "{checkout}/%s" % xpi_config.directory
         if xpi_revision:
             checkout_config["head_rev"] = xpi_revision
-        if "docker-image" in xpi_config:
-            task["worker"]["docker-image"]["in-tree"] = xpi_config["docker-image"]
+        if xpi_config.docker_image:
+            task["worker"]["docker-image"]["in-tree"] = xpi_config.docker_image
         task["label"] = f"{config.kind}-{xpi_name}"
-        if xpi_config.get("private-repo"):
+        if xpi_config.private_repo:
             checkout_config["ssh_secret_name"] = config.graph_config[
                 "github_clone_secret"
             ]
@@ -55,12 +58,15 @@ def test_tasks_from_manifest(config, tasks):
         else:
             artifact_prefix = "public/build"
         env["ARTIFACT_PREFIX"] = artifact_prefix
-        if xpi_config.get("install-type"):
-            env["XPI_INSTALL_TYPE"] = xpi_config["install-type"]
+        if xpi_config.install_type:
+            env["XPI_INSTALL_TYPE"] = xpi_config.install_type
 
-        if task.get("only-for-formats"):
-            if xpi_config.get("addon-type") not in task.pop("only-for-formats"):
+        if only_for_formats := task.pop("only-for-formats", None):
+            if xpi_config.addon_type not in only_for_formats:
                 continue
+            task["attributes"].setdefault("digest-extra", {})[
+                "only-for-formats"
+            ] = only_for_formats
             # This `xpis` dict is created in `transforms/build.py`.
             artifacts = list(task["attributes"]["xpis"].values())
             # We take the name of the XPI from the list of artifacts because
@@ -73,3 +79,43 @@ def test_tasks_from_manifest(config, tasks):
             run["command"] = run["command"].format(xpi_file=xpi_file)
 
         yield task
+
+
+@transforms.add
+def cache_post_build(config, tasks):
+    """Reuse a task that already passed against a build with the same inputs,
+    using the same command and docker image."""
+    for task in tasks:
+        dep = get_primary_dependency(config, task)
+        inputs_digest = dep.attributes.get("inputs-digest")
+        if not inputs_digest or taskgraph.fast:
+            yield task
+            continue
+
+        image = task["worker"]["docker-image"]["in-tree"]
+        image_task = config.kind_dependencies_tasks[f"docker-image-{image}"]
+        inputs = {
+            "build": inputs_digest,
+            image_task.label: image_task.attributes["cached_task"]["digest"],
+            "digest-extra": json.dumps(
+                task["attributes"].get("digest-extra", {}), sort_keys=True
+            ),
+            "command": task["run"]["command"],
+        }
+        digest_data = list(inputs.values())
+        task["extra"]["cache-inputs"] = {
+            name: hash_string(data) for name, data in inputs.items()
+        }
+        add_optimization(
+            config,
+            task,
+            cache_type=f"xpi-manifest.v1.{config.kind}",
+            cache_name=task["extra"]["xpi-name"],
+            digest_data=digest_data,
+        )
+        # The build these tasks depend on isn't replaced in actions, so
+        # `index-search` would never apply; remove them instead. Nothing may
+        # depend on them (see `verify_skip_if_indexed`), so release-signing
+        # only has a soft dependency on addons-linter.
+        task["optimization"] = {"skip-if-indexed": task["optimization"]["index-search"]}
+        yield task
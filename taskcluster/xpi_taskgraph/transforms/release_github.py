@@ -12,7 +12,7 @@ from taskgraph.config import load_graph_config
 from taskgraph.transforms.base import TransformSequence
 from taskgraph.util.dependencies import get_primary_dependency
 from taskgraph.util.schema import resolve_keyed_by
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # /taskcluster
 
@@ -31,8 +31,6 @@ def resolve_keys(config, tasks):
 
 @transforms.add
 def build_worker_definition(config, tasks):
-    manifest = get_manifest()
-
     for task in tasks:
         if not (
             config.params.get("version")
@@ -48,13 +46,13 @@ def build_worker_definition(config, tasks):
         )
 
         # translate input xpi_name to get manifest and graph info
-        manifest_config = manifest[config.params["xpi_name"]]
+        manifest_config = get_manifest_entry(config.params["xpi_name"])
 
         # if this is false in the manifest, no need to create github-release task
-        if not manifest_config.get("enable-github-release", False):
+        if not manifest_config.enable_github_release:
             continue
 
-        repo_prefix = manifest_config["repo-prefix"]
+        repo_prefix = manifest_config.repo_prefix
         graph_config = load_graph_config(ROOT)
         repo_url = graph_config["taskgraph"]["repositories"][repo_prefix][
             "default-repository"
@@ -79,12 +77,12 @@ def build_worker_definition(config, tasks):
             "version": config.params["version"],
             "build_number": config.params["build_number"],
         }
-        tag_name = manifest_config.get(
-            "release-tag", "{version}-build{build_number}"
+        tag_name = (
+            manifest_config.release_tag or "{version}-build{build_number}"
         ).format(**release_variables)
         worker_definition["git-tag"] = tag_name
-        release_name = manifest_config.get(
-            "release-name", "{xpi_name}-{version}-build{build_number}"
+        release_name = (
+            manifest_config.release_name or "{xpi_name}-{version}-build{build_number}"
         ).format(**release_variables)
         task["worker"]["release-name"] = release_name
 
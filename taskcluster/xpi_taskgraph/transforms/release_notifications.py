@@ -8,7 +8,7 @@ Add notifications via taskcluster-notify for release tasks
 
 from taskgraph.transforms.base import TransformSequence
 from taskgraph.util.keyed_by import evaluate_keyed_by
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 transforms = TransformSequence()
 
@@ -22,7 +22,6 @@ def add_notifications(config, tasks):
 
     if not all([xpi_name, xpi_revision, shipping_phase]):
         return
-    manifest = get_manifest()
 
     for task in tasks:
         if "xpi-name" in task.get("attributes", {}):
@@ -31,8 +30,8 @@ def add_notifications(config, tasks):
         if task.get("attributes", {}).get("shipping-phase") != shipping_phase:
             continue
         task["label"] = f"{config.kind}-{shipping_phase}"
-        xpi_config = manifest[xpi_name]
-        xpi_type = xpi_config["addon-type"]
+        xpi_config = get_manifest_entry(xpi_name)
+        xpi_type = xpi_config.addon_type
 
         emails = evaluate_keyed_by(
             config.graph_config["release-promotion"]["notifications"][xpi_type],
@@ -42,7 +41,7 @@ def add_notifications(config, tasks):
         if not emails:
             continue
         emails = set(
-            emails + additional_shipit_emails + xpi_config.get("additional-emails", [])
+            emails + additional_shipit_emails + list(xpi_config.additional_emails)
         )
         notifications = evaluate_keyed_by(
             task.pop("notifications"), "notification config", dict(phase=shipping_phase)
@@ -87,5 +87,15 @@ def build_signing_task(config, tasks):
         yield task
 
 
+@transforms.add
+def soften_linter_dependency(config, tasks):
+    """Only wait for addons-linter if it runs in this graph. It's removed when
+    it already passed for a build with the same inputs."""
+    for task in tasks:
+        if label := task.get("dependencies", {}).pop("addons-linter", None):
+            task.setdefault("soft-dependencies", []).append(label)
+        yield task
+
+
 def _get_dependent_task_name_without_its_kind(dependent_task):
     return dependent_task.label[len(dependent_task.kind) + 1 :]
@@ -5,7 +5,7 @@
 from taskgraph.transforms.base import TransformSequence
 from taskgraph.util.dependencies import get_primary_dependency
 from taskgraph.util.schema import Schema, resolve_keyed_by
-from xpi_taskgraph.xpi_manifest import get_manifest
+from xpi_taskgraph.xpi_manifest import get_manifest_entry
 
 
 class VersionBumpSchema(Schema, forbid_unknown_fields=False, kw_only=True):
@@ -21,15 +21,14 @@ transforms.add_validate(VersionBumpSchema)
 
 @transforms.add
 def add_version_bump_task(config, tasks):
-    manifest = get_manifest()
     for task in tasks:
         if not (config.params.get("xpi_name") and config.params.get("level")):
             continue
 
         xpi_name = config.params["xpi_name"]
-        xpi_manifest = manifest[xpi_name]
+        xpi_manifest = get_manifest_entry(xpi_name)
 
-        if not xpi_manifest.get("enable-version-bump"):
+        if not xpi_manifest.enable_version_bump:
             continue
 
         resolve_keyed_by(
@@ -41,7 +40,7 @@ def add_version_bump_task(config, tasks):
 
         dep = get_primary_dependency(config, task)
         lando_repo = task.pop("lando-repo")
-        manifest_file = f"{xpi_manifest['directory']}/manifest.json"
+        manifest_file = f"{xpi_manifest.directory}/manifest.json"
 
         task["label"] = f"version-bump-{xpi_name}"
         task["description"] = (
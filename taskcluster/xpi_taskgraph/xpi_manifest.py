@@ -3,76 +3,268 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-from copy import deepcopy
 import glob
+import hashlib
+import logging
 import os
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from functools import lru_cache
+from itertools import repeat
+from typing import Literal, Optional
 
+import msgspec
+import msgspec.yaml
 from taskgraph.config import load_graph_config
-from taskgraph.util.schema import validate_schema
-from taskgraph.util import yaml
 from taskgraph.util.readonlydict import ReadOnlyDict
-from voluptuous import Optional, Required, Schema, Any
+from taskgraph.util.schema import Schema
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 ROOT = os.path.join(BASE_DIR, "taskcluster")
 MANIFEST_DIR = os.path.join(BASE_DIR, "manifests")
+# Validated manifests are cached on disk between decision and action tasks,
+# which mount a per-level cache for them (see .taskcluster.yml).
+# Set XPI_MANIFEST_CACHE_DIR to an empty string to disable the cache.
+CACHE_DIR = os.environ.get(
+    "XPI_MANIFEST_CACHE_DIR", os.path.expanduser("~/.cache/xpi-manifest")
+)
+# Number of processes used to parse and validate manifests; 1 is serial.
+MANIFEST_JOBS = int(os.environ.get("XPI_MANIFEST_JOBS", 1))
+
+
+class XpiManifest(Schema, frozen=True):
+    """A validated ``manifests/*.yml`` file.
+
+    Keys are kebab-cased in YAML and snake_cased as attributes; unknown keys
+    are rejected while decoding.
+    """
+
+    repo_prefix: str
+    artifacts: tuple[str, ...]
+    # normandy-privileged is deprecated
+    addon_type: Literal[
+        "mozillaonline-privileged", "normandy-privileged", "privileged", "system"
+    ]
+    # Derived from the file name rather than read from the YAML.
+    manifest_name: str = ""
+    description: Optional[str] = None
+    directory: Optional[str] = None
+    active: bool = False
+    additional_emails: tuple[str, ...] = ()
+    private_repo: bool = False
+    branch: Optional[str] = None
+    docker_image: Optional[str] = None
+    install_type: Optional[Literal["mach", "npm", "yarn"]] = None
+    build_env: dict[str, str] = {}
+    enable_balrog: bool = False
+    enable_github_release: bool = False
+    enable_test: bool = True
+    enable_version_bump: bool = False
+    release_tag: Optional[str] = None
+    release_name: Optional[str] = None
 
 
-base_schema = Schema(
-    {
-        Required("manifest_name"): str,
-        Optional("description"): str,
-        Required("repo-prefix"): str,
-        Optional("directory"): str,
-        Optional("active"): bool,
-        Optional("additional-emails"): [str],
-        Optional("private-repo"): bool,
-        Optional("branch"): str,
-        Optional("docker-image"): str,
-        Required("artifacts"): [str],
-        # normandy-privileged is deprecated
-        Required("addon-type"): Any(
-            "mozillaonline-privileged", "normandy-privileged", "privileged", "system"
-        ),
-        Optional("install-type"): Any("mach", "npm", "yarn"),
-        Optional("build-env"): {str: str},
-        Optional("enable-balrog"): bool,
-        Optional("enable-github-release"): bool,
-        Optional("enable-test"): bool,
-        Optional("enable-version-bump"): bool,
-        Optional("release-tag"): str,
-        Optional("release-name"): str,
-    }
+# XpiManifest fields that ManifestIndex can look manifests up by.
+INDEXED_FIELDS = (
+    "active",
+    "addon_type",
+    "enable_balrog",
+    "enable_github_release",
+    "enable_test",
+    "enable_version_bump",
+    "repo_prefix",
 )
 
 
+class ManifestIndex:
+    """Immutable secondary indexes over a set of manifests.
+
+    Each indexed field maps every value it takes to the frozenset of
+    manifest names with that value, so a query is a dict lookup per
+    criterion rather than a scan over every manifest.
+    """
+
+    def __init__(self, manifests):
+        self._manifests = manifests
+        index = defaultdict(set)
+        for name, xpi_config in manifests.items():
+            for field in INDEXED_FIELDS:
+                index[field, getattr(xpi_config, field)].add(name)
+        self._index = {key: frozenset(names) for key, names in index.items()}
+
+    def names(self, **criteria):
+        """Return the sorted names of the manifests matching every criterion,
+        e.g. ``names(addon_type="system", active=True)``."""
+        matches = None
+        for field, value in criteria.items():
+            if field not in INDEXED_FIELDS:
+                raise KeyError(f"{field} is not an indexed manifest field")
+            names = self._index.get((field, value), frozenset())
+            matches = names if matches is None else matches & names
+        if matches is None:
+            matches = self._manifests.keys()
+        return sorted(matches)
+
+    def query(self, **criteria):
+        """Return the manifests matching every criterion, ordered by name."""
+        return [self._manifests[name] for name in self.names(**criteria)]
+
+
+class _CacheEntry(msgspec.Struct, frozen=True):
+    hash: str
+    manifest: XpiManifest
+
+
+class _ManifestCache(msgspec.Struct):
+    key: str
+    manifests: dict[str, _CacheEntry]
+
+
 def check_manifest(xpi_config, graph_config):
-    if xpi_config["repo-prefix"] not in graph_config["taskgraph"]["repositories"]:
+    if xpi_config.repo_prefix not in graph_config["taskgraph"]["repositories"]:
         raise Exception(
-            "{} repo-prefix not in graph_config!".format(xpi_config["manifest_name"])
+            "{} repo-prefix not in graph_config!".format(xpi_config.manifest_name)
         )
     # No '-' allowed in repo-prefixes
-    if "-" in xpi_config["repo-prefix"]:
+    if "-" in xpi_config.repo_prefix:
         raise Exception(
             "{} repo-prefix contains a '-': {}".format(
-                xpi_config["manifest_name"], xpi_config["repo-prefix"]
+                xpi_config.manifest_name, xpi_config.repo_prefix
             )
         )
 
 
+def _hash_file(path):
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _get_cache_key():
+    """The cache is only valid for the graph config and schema it was
+    validated against."""
+    return "{}-{}".format(
+        _hash_file(os.path.join(ROOT, "config.yml")), _hash_file(__file__)
+    )
+
+
+def _read_cache(cache_key):
+    if not CACHE_DIR:
+        return {}
+    try:
+        with open(os.path.join(CACHE_DIR, "manifests.json"), "rb") as fh:
+            cache = msgspec.json.decode(fh.read(), type=_ManifestCache)
+    except (OSError, msgspec.DecodeError):
+        return {}
+    if cache.key != cache_key:
+        return {}
+    return cache.manifests
+
+
+def _write_cache(cache_key, entries):
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(msgspec.json.encode(_ManifestCache(cache_key, entries)))
+        os.replace(tmp_path, os.path.join(CACHE_DIR, "manifests.json"))
+    except OSError as e:
+        logger.warning(f"Could not write manifest cache to {CACHE_DIR}: {e}")
+
+
+def load_manifest(path, graph_config):
+    with open(path, "rb") as fh:
+        xpi_config = msgspec.yaml.decode(fh.read(), type=XpiManifest)
+    xpi_config = msgspec.structs.replace(
+        xpi_config, manifest_name=os.path.basename(path).replace(".yml", "")
+    )
+    check_manifest(xpi_config, graph_config)
+    return xpi_config
+
+
+def _load_manifest_or_error(path, graph_config):
+    try:
+        return load_manifest(path, graph_config), None
+    except Exception as e:
+        return None, "{}: {}".format(os.path.basename(path), e)
+
+
+def load_manifests(paths, graph_config, jobs=1):
+    """Parse and validate ``paths``, optionally across ``jobs`` processes.
+
+    Every invalid manifest is reported in a single exception rather than
+    failing on the first one.
+    """
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(_load_manifest_or_error, paths, repeat(graph_config))
+            )
+    else:
+        results = [_load_manifest_or_error(path, graph_config) for path in paths]
+    errors = [error for _, error in results if error]
+    if errors:
+        raise Exception(
+            "{} invalid manifest(s):\n\n{}".format(len(errors), "\n\n".join(errors))
+        )
+    return {manifest.manifest_name: manifest for manifest, _ in results}
+
+
 @lru_cache(maxsize=None)
 def get_manifest():
-    manifest_paths = glob.glob(os.path.join(MANIFEST_DIR, "*.yml"))
+    manifest_paths = sorted(glob.glob(os.path.join(MANIFEST_DIR, "*.yml")))
     all_manifests = {}
-    graph_config = load_graph_config(ROOT)
+    cache_key = _get_cache_key()
+    cached = _read_cache(cache_key)
+    hashes = {}
+    stale_paths = []
     for path in manifest_paths:
-        rw_manifest = yaml.load_yaml(path)
         manifest_name = os.path.basename(path).replace(".yml", "")
-        rw_manifest["manifest_name"] = manifest_name
-        validate_schema(base_schema, deepcopy(rw_manifest), "Invalid manifest:")
-        check_manifest(deepcopy(rw_manifest), graph_config)
-        rw_manifest["artifacts"] = tuple(rw_manifest["artifacts"])
-        assert manifest_name not in all_manifests
-        all_manifests[manifest_name] = ReadOnlyDict(rw_manifest)
+        assert manifest_name not in hashes
+        hashes[manifest_name] = _hash_file(path)
+        entry = cached.get(manifest_name)
+        if not entry or entry.hash != hashes[manifest_name]:
+            stale_paths.append(path)
+    loaded = {}
+    if stale_paths:
+        loaded = load_manifests(stale_paths, load_graph_config(ROOT), MANIFEST_JOBS)
+    entries = {}
+    for manifest_name, manifest_hash in hashes.items():
+        if manifest_name in loaded:
+            xpi_config = loaded[manifest_name]
+        else:
+            xpi_config = cached[manifest_name].manifest
+        entries[manifest_name] = _CacheEntry(manifest_hash, xpi_config)
+        all_manifests[manifest_name] = xpi_config
+    if entries != cached:
+        _write_cache(cache_key, entries)
     return ReadOnlyDict(all_manifests)
+
+
+@lru_cache(maxsize=None)
+def get_manifest_index():
+    return ManifestIndex(get_manifest())
+
+
+@lru_cache(maxsize=None)
+def get_manifest_entry(manifest_name):
+    """Return the ``XpiManifest`` for ``manifest_name``.
+
+    Unlike ``get_manifest()``, only the requested manifest is parsed and
+    validated, so targeted decisions (e.g. release promotion actions) don't
+    pay for every manifest in the repo. Raises ``KeyError`` for unknown
+    manifests.
+    """
+    if get_manifest.cache_info().currsize:
+        return get_manifest()[manifest_name]
+    path = os.path.join(MANIFEST_DIR, f"{manifest_name}.yml")
+    if os.path.basename(path) != f"{manifest_name}.yml" or not os.path.isfile(path):
+        raise KeyError(manifest_name)
+    entry = _read_cache(_get_cache_key()).get(manifest_name)
+    if entry and entry.hash == _hash_file(path):
+        return entry.manifest
+    return load_manifest(path, load_graph_config(ROOT))